@@ -0,0 +1,35 @@
+# Rendered once per core allocation mode, e.g. gnuplot -e "name='checker_utilization_heterogeneous'"
+if (!exists("name")) name = 'checker_utilization'
+
+# Set the output to an EPS file
+set terminal postscript eps enhanced color  size 2.5, 1.4 font ",11"
+set output name.'.eps'
+
+# Set the title and labels
+set ylabel "Percentage (%)" font ",11"
+
+set x2tics out scale 0 format "" 0.5,1, 29
+
+# Set grid and style
+set grid x2 y
+
+set style data histograms
+set style histogram cluster gap 1
+set style fill solid 0.7 border -1
+
+# Rotate the x labels for better readability
+set xtics  out nomirror rotate by 45 right 1, 4, 9 format "" font ",8"
+
+set bmargin 4.5
+set rmargin 1
+
+# Set the range for y-axis
+set yrange [0:*]
+
+# Plot the data
+plot name.'.dat' using 2:xtic(1) title 'Checker-core utilization'  linecolor rgb "#44aaff", \
+     '' using 3 title 'Checker/main CPU time' linecolor rgb "#2ca02c"
+
+set terminal pngcairo
+set output name.'.png'
+replot
@@ -3,7 +3,7 @@
 set -e
 
 echo "Installing dependencies"
-sudo apt-get install -y build-essential gfortran flex bison libssl-dev libelf-dev device-tree-compiler python3 python3-subprocess-tee python3-dataclasses-json python3-filelock python3-prctl python3-numpy curl gnuplot
+sudo apt-get install -y build-essential gfortran flex bison libssl-dev libelf-dev device-tree-compiler python3 python3-subprocess-tee python3-filelock python3-prctl python3-numpy python3-matplotlib python3-zstandard curl gnuplot
 
 if ! [ -x "$(command -v docker)" ]; then
     echo "Installing Docker"
@@ -18,10 +18,30 @@ function find_one_parallaft_result() {
     echo "${dirs[0]}"
 }
 
-COLLECT_STATS_ARGS=(
+function find_parallaft_results_for_core_alloc() {
+    local dir
+    for dir in "$RUN_DIR"/parallaft_*_"$1"_parallaft-unknown; do
+        case "$(basename "$dir")" in
+        parallaft_perfcounters_* | parallaft_raft_*) ;;
+        *) echo "$dir" ;;
+        esac
+    done
+}
+
+EXPERIMENT_ARGS=(
     --base "$RUN_DIR/base"
     --parallaft `find_one_parallaft_result`
     --raft "$RUN_DIR/parallaft_raft_all-big_parallaft-unknown"
+)
+
+if [ `uname -m` = "aarch64" ]; then
+    EXPERIMENT_ARGS+=(
+        --base_perf_counters "$RUN_DIR/parallaft_perfcounters_all-big_parallaft-unknown"
+    )
+fi
+
+COLLECT_STATS_ARGS=(
+    "${EXPERIMENT_ARGS[@]}"
     --no-bench-number
     --no-header
     --sep " "
@@ -29,10 +49,30 @@ COLLECT_STATS_ARGS=(
     --geomean
 )
 
-if [ `uname -m` = "aarch64" ]; then
-    COLLECT_STATS_ARGS+=(
-        --base_perf_counters "$RUN_DIR/parallaft_perfcounters_all-big_parallaft-unknown"
-    )
+if [ "${PLOT_BACKEND:-gnuplot}" = "matplotlib" ]; then
+    # Render all figures in-process, sharing the parsed stats between them
+    ./tools/plot_stats.py \
+        performance_overhead performance_overhead_breakdown energy_overhead \
+        --output-dir "$PLOTS_DIR" \
+        --format eps png pdf \
+        "${EXPERIMENT_ARGS[@]}"
+
+    VARIANT_ARGS=()
+    for core_alloc in all-big all-small heterogeneous inverted-heterogeneous; do
+        for dir in `find_parallaft_results_for_core_alloc $core_alloc`; do
+            VARIANT_ARGS+=(--parallaft-variant "_$core_alloc" "$dir")
+            break
+        done
+    done
+
+    if [ ${#VARIANT_ARGS[@]} -ne 0 ]; then
+        ./tools/plot_stats.py checker_utilization \
+            --output-dir "$PLOTS_DIR" \
+            --format eps png pdf \
+            "${VARIANT_ARGS[@]}"
+    fi
+
+    exit 0
 fi
 
 function plot_graph() {
@@ -46,3 +86,14 @@ plot_graph parallaft_performance_overhead_breakdown performance_overhead_breakdo
 if [ `uname -m` = "aarch64" ]; then
     plot_graph energy_overhead_parallaft_vs_raft energy_overhead
 fi
+
+for core_alloc in all-big all-small heterogeneous inverted-heterogeneous; do
+    for dir in `find_parallaft_results_for_core_alloc $core_alloc`; do
+        ./tools/collect_stats.py parallaft_checker_utilization \
+            --output "$PLOTS_DIR/checker_utilization_$core_alloc.dat" \
+            --parallaft "$dir" \
+            --no-bench-number --no-header --sep " " --scale 100.0
+        make -C "$PLOTS_DIR" checker_utilization_$core_alloc.pdf
+        break
+    done
+done
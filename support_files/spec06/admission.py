@@ -0,0 +1,149 @@
+from typing import Callable, Dict, List, NamedTuple, Optional, TypeVar
+from pathlib import Path
+
+import threading
+
+MEMINFO_PATH = Path("/proc/meminfo")
+PSI_MEMORY_PATH = Path("/proc/pressure/memory")
+
+# peaks are sampled periodically, so the real peak may be a bit higher
+FOOTPRINT_MARGIN = 1.25
+
+POLL_INTERVAL = 1.0
+
+T = TypeVar("T")
+
+
+class AdmissionPolicy(NamedTuple):
+    max_jobs: int = 1
+    # bytes, defaults to the memory available when the experiment starts
+    memory_budget: Optional[int] = None
+    # bytes kept available for the page cache, SPEC tools and the harness
+    memory_reserve: int = 2 << 30
+    # PSI `some avg10` of memory, in percent, above which no job is started
+    max_memory_pressure: float = 10.0
+
+
+class Job(NamedTuple):
+    name: str
+    # predicted peak memory in bytes, None if unknown
+    footprint: Optional[int]
+
+
+def read_meminfo(path: Path = MEMINFO_PATH) -> Dict[str, int]:
+    out = {}
+
+    for line in path.read_text().splitlines():
+        k, _, v = line.partition(":")
+        parts = v.split()
+        if len(parts) == 2 and parts[1] == "kB":
+            out[k] = int(parts[0]) * 1024
+        elif len(parts) == 1:
+            out[k] = int(parts[0])
+
+    return out
+
+
+def read_memory_pressure(path: Path = PSI_MEMORY_PATH) -> Optional[float]:
+    try:
+        text = path.read_text()
+    except OSError:
+        # kernels without CONFIG_PSI
+        return None
+
+    for line in text.splitlines():
+        kind, *fields = line.split()
+        if kind == "some":
+            return float(dict(f.split("=", 1) for f in fields)["avg10"])
+
+    return None
+
+
+def format_bytes(n: Optional[int]) -> str:
+    return "unknown" if n is None else f"{n / (1 << 30):.2f} GiB"
+
+
+class MemoryAdmission:
+    # Starts jobs concurrently while their predicted footprints fit into the
+    # memory budget, and holds back new jobs while the system is short of
+    # memory, so that running benchmarks never get swapped out
+
+    def __init__(self, policy: AdmissionPolicy):
+        self.policy = policy
+        self.budget = policy.memory_budget
+        if self.budget is None:
+            self.budget = read_meminfo()["MemAvailable"] - policy.memory_reserve
+
+        self.running: Dict[str, Optional[int]] = {}
+        self.cond = threading.Condition()
+
+    def check(self, job: Job) -> Optional[str]:
+        # returns why the job can't be started now, or None if it can
+        if len(self.running) == 0:
+            # always make progress, even if the job doesn't fit the budget
+            return None
+
+        if len(self.running) >= self.policy.max_jobs:
+            return "all job slots are busy"
+
+        if job.footprint is None or None in self.running.values():
+            return "jobs with unknown footprints run alone"
+
+        committed = sum(self.running.values())  # type: ignore
+        if committed + job.footprint > self.budget:  # type: ignore
+            return f"{format_bytes(committed)} of {format_bytes(self.budget)} committed"
+
+        available = read_meminfo()["MemAvailable"] - self.policy.memory_reserve
+        if job.footprint > available:
+            return f"only {format_bytes(available)} available"
+
+        pressure = read_memory_pressure()
+        if pressure is not None and pressure > self.policy.max_memory_pressure:
+            return f"memory pressure is {pressure:.1f}%"
+
+        return None
+
+    def run(self, jobs: List[Job], fn: Callable[[Job], T]) -> List[T]:
+        results: Dict[str, T] = {}
+        errors: List[BaseException] = []
+        pending = list(jobs)
+        threads = []
+
+        def worker(job: Job):
+            try:
+                results[job.name] = fn(job)
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                with self.cond:
+                    del self.running[job.name]
+                    self.cond.notify_all()
+
+        with self.cond:
+            while pending and not errors:
+                reasons = [self.check(job) for job in pending]
+
+                # first fit, so that small jobs fill the gaps left by big ones
+                try:
+                    i = reasons.index(None)
+                except ValueError:
+                    self.cond.wait(POLL_INTERVAL)
+                    continue
+
+                job = pending.pop(i)
+                self.running[job.name] = job.footprint
+                print(
+                    f"Starting {job.name} (predicted footprint {format_bytes(job.footprint)}, {len(self.running)} running)"
+                )
+
+                thread = threading.Thread(target=worker, args=(job,))
+                thread.start()
+                threads.append(thread)
+
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            raise errors[0]
+
+        return [results[job.name] for job in jobs]
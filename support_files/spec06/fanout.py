@@ -0,0 +1,487 @@
+#!/usr/bin/python3
+
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from itertools import product
+from pathlib import Path
+from pprint import pformat
+from queue import Empty, Queue
+
+import argparse
+import filecmp
+import json
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from run import (
+    EXPERIMENT_OPTION_LIST,
+    EXPERIMENT_OPTION_MAP,
+    MANIFEST_FILENAME,
+    MANIFEST_STATE_COMPLETE,
+    MANIFEST_STATE_RUNNING,
+    CORE_PLAN_FILENAME,
+    HARNESS_FILENAME,
+    META_FILENAME,
+    Metadata,
+    load_metadata,
+    make_metadata,
+    write_file_atomic,
+    write_manifest,
+)
+from logstore import CORE_STORE_FILENAME, ZSTD_SUFFIX, CoreStore
+from hostprofile import HOST_PROFILE_FILENAME
+
+# env keys that must be identical on all workers for their results to be merged
+CONSISTENT_ENV_KEYS = ["kernel_ver", "parallaft_ver"]
+
+SPEC_LOG_NAMES = ["spec_stdout.log", "spec_stderr.log"]
+
+# files describing the setup of a whole experiment, which must be identical
+# across jobs
+CONSISTENT_RUN_FILENAMES = [HOST_PROFILE_FILENAME, CORE_PLAN_FILENAME]
+
+
+class Transport:
+    name: str
+    releval_dir: str
+
+    def run(self, args: List[str]) -> subprocess.CompletedProcess:
+        raise NotImplementedError
+
+    def fetch(self, remote_dir: str, local_dir: Path):
+        raise NotImplementedError
+
+    def run_py(self, args: List[str]) -> subprocess.CompletedProcess:
+        return self.run([f"{self.releval_dir}/run.py"] + args)
+
+    def remove(self, remote_dir: str):
+        self.run(["rm", "-rf", remote_dir])
+
+
+class LocalTransport(Transport):
+    # stand-in for a remote worker, running jobs on a local releval directory
+    def __init__(self, releval_dir: str, name: Optional[str] = None):
+        self.releval_dir = releval_dir
+        self.name = name or f"local:{releval_dir}"
+
+    def run(self, args: List[str]) -> subprocess.CompletedProcess:
+        return subprocess.run(args, capture_output=True, text=True)
+
+    def fetch(self, remote_dir: str, local_dir: Path):
+        # follows the symlinks to SPEC results like rsync -L does
+        shutil.copytree(
+            remote_dir,
+            local_dir,
+            ignore=shutil.ignore_patterns("*.tmp"),
+            dirs_exist_ok=True,
+        )
+
+
+class SSHTransport(Transport):
+    def __init__(
+        self, host: str, releval_dir: str, ssh_args: Optional[List[str]] = None
+    ):
+        self.host = host
+        self.releval_dir = releval_dir
+        self.ssh_args = ssh_args if ssh_args is not None else []
+        self.name = f"{host}:{releval_dir}"
+
+    def run(self, args: List[str]) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            ["ssh", *self.ssh_args, self.host, shlex.join(args)],
+            capture_output=True,
+            text=True,
+        )
+
+    def fetch(self, remote_dir: str, local_dir: Path):
+        local_dir.mkdir(parents=True, exist_ok=True)
+        subprocess.run(
+            [
+                "rsync",
+                "-a",
+                "--copy-links",
+                "--exclude=*.tmp",
+                "-e",
+                shlex.join(["ssh", *self.ssh_args]),
+                f"{self.host}:{remote_dir}/",
+                f"{local_dir}/",
+            ],
+            check=True,
+        )
+
+
+def parse_host(spec: str, ssh_args: List[str]) -> Transport:
+    # local:/path/to/spec06/releval or [user@]host:/path/to/spec06/releval
+    host, sep, releval_dir = spec.partition(":")
+    if not sep or not releval_dir:
+        raise ValueError(f"Invalid host {spec}, expecting [user@]host:releval_dir")
+
+    if host == "local":
+        return LocalTransport(releval_dir)
+
+    return SSHTransport(host, releval_dir, ssh_args)
+
+
+class Job(NamedTuple):
+    exp_name: str
+    benchmark: str
+    metadata: Metadata
+
+
+def config_to_args(config: Dict[str, Any]) -> List[str]:
+    args = []
+
+    for name, value in config.items():
+        option = EXPERIMENT_OPTION_MAP[name]
+        if option.type == bool:
+            args.append(f"--{name}" if value else f"--no-{name}")
+        else:
+            args += [f"--{name}", str(value)]
+
+    return args
+
+
+def parse_sweep(sweep: List[str], base_config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    names = []
+    value_lists = []
+
+    for s in sweep:
+        name, _, values = s.partition("=")
+        if name not in EXPERIMENT_OPTION_MAP:
+            raise ValueError(f"Unknown option {name} in sweep {s}")
+
+        option = EXPERIMENT_OPTION_MAP[name]
+        if option.type == bool:
+            parsed = [v.lower() in ("1", "true", "yes") for v in values.split(",")]
+        else:
+            parsed = [option.type(v) for v in values.split(",")]
+
+        for v in parsed:
+            option.validate(v)
+
+        names.append(name)
+        value_lists.append(parsed)
+
+    configs = []
+    for values in product(*value_lists):
+        config = dict(base_config)
+        config.update(zip(names, values))
+        configs.append(config)
+
+    return configs
+
+
+def get_worker_env(transport: Transport) -> Dict[str, str]:
+    output = transport.run_py(["--print-run-env"])
+    if output.returncode != 0:
+        raise RuntimeError(
+            f"Failed to get run env from {transport.name}:\n{output.stderr}"
+        )
+    return json.loads(output.stdout)
+
+
+def check_env_consistency(envs: Dict[str, Dict[str, str]]) -> Dict[str, str]:
+    hosts = list(envs)
+    ref_host = hosts[0]
+    ref_env = envs[ref_host]
+
+    for host in hosts[1:]:
+        for key in CONSISTENT_ENV_KEYS:
+            if envs[host].get(key) != ref_env.get(key):
+                raise RuntimeError(
+                    f"Inconsistent {key} across workers: {ref_env.get(key)} on {ref_host}, {envs[host].get(key)} on {host}"
+                )
+
+    env = dict(ref_env)
+    env["hostname"] = ",".join(sorted(set(e["hostname"] for e in envs.values())))
+    return env
+
+
+def merge_run_dir(src: Path, dst: Path, benchmark: str):
+    files = []
+
+    for name in ["result", "log"]:
+        for p in sorted((src / name).rglob("*")):
+            if p.is_dir():
+                continue
+
+            rel_path = p.relative_to(src)
+
+            # core dump stores are merged below instead of being copied
+            if rel_path == Path("log") / CORE_STORE_FILENAME:
+                continue
+
+            # logs of the SPEC run are per job, not per result file
+            log_name = rel_path.name.removesuffix(ZSTD_SUFFIX)
+            if rel_path.parent == Path("log") and log_name in SPEC_LOG_NAMES:
+                stem, ext = log_name.rsplit(".", 1)
+                rel_path = rel_path.parent / (
+                    f"{stem}.{benchmark}.{ext}" + rel_path.name[len(log_name) :]
+                )
+
+            files.append((p, dst / rel_path))
+
+    for name in CONSISTENT_RUN_FILENAMES:
+        p = src / name
+        if p.exists():
+            files.append((p, dst / name))
+        elif (dst / name).exists():
+            raise RuntimeError(f"{name} is missing from the job, but not {dst}")
+
+    # check for conflicts first, so that a failed job doesn't merge partially
+    for p, target in files:
+        if target.exists() and not filecmp.cmp(p, target, shallow=False):
+            raise RuntimeError(f"Conflicting result file {target}")
+
+    for p, target in files:
+        if not target.exists():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(p, target)
+
+    # each job records the timings of its own runs
+    harness_path = src / HARNESS_FILENAME
+    if harness_path.exists():
+        with open(dst / HARNESS_FILENAME, "a") as f:
+            f.write(harness_path.read_text())
+
+    core_store_path = src / "log" / CORE_STORE_FILENAME
+    if core_store_path.exists():
+        (dst / "log").mkdir(parents=True, exist_ok=True)
+        store = CoreStore(dst / "log" / CORE_STORE_FILENAME)
+        try:
+            store.merge(core_store_path)
+        finally:
+            store.close()
+
+
+class Coordinator:
+    def __init__(
+        self,
+        transports: List[Transport],
+        releval_dir: Path,
+        worker_args: Optional[List[str]] = None,
+        keep_remote: bool = False,
+    ):
+        self.transports = transports
+        self.releval_dir = releval_dir
+        self.worker_args = worker_args if worker_args is not None else []
+        self.keep_remote = keep_remote
+        self.session = time.strftime("%Y%m%d%H%M%S")
+        self.merge_lock = threading.Lock()
+        self.failed_jobs: List[Tuple[Job, str, str]] = []
+
+    def prepare_run_dir(self, exp_name: str, metadata: Metadata, overwrite: bool):
+        run_dir = self.releval_dir / "run" / exp_name
+
+        metadata_ref = load_metadata(run_dir)
+
+        if metadata_ref is not None:
+            if not overwrite:
+                raise RuntimeError(f"Experiment {exp_name} already exists")
+            if metadata != metadata_ref:
+                raise RuntimeError(f"Metadata mismatch for experiment {exp_name}")
+        else:
+            run_dir.mkdir(parents=True, exist_ok=True)
+            write_file_atomic(
+                run_dir / META_FILENAME, metadata.to_json(), exclusive=True
+            )
+
+        write_manifest(run_dir, MANIFEST_STATE_RUNNING)
+
+    def run_job(self, transport: Transport, job: Job, job_idx: int):
+        worker_exp_name = f"{job.exp_name}.fanout-{self.session}-{job_idx}"
+        worker_run_dir = f"{transport.releval_dir}/run/{worker_exp_name}"
+
+        output = transport.run_py(
+            ["--name", worker_exp_name]
+            + config_to_args(job.metadata.config)
+            + self.worker_args
+            + [job.benchmark]
+        )
+
+        if output.returncode != 0:
+            stderr_tail = "\n".join(output.stderr.splitlines()[-10:])
+            raise RuntimeError(
+                f"Job failed with exit code {output.returncode}:\n{stderr_tail}"
+            )
+
+        with tempfile.TemporaryDirectory() as staging:
+            staging_dir = Path(staging)
+            transport.fetch(worker_run_dir, staging_dir)
+
+            worker_metadata = Metadata.from_json(
+                (staging_dir / META_FILENAME).read_text()
+            )
+
+            for key in CONSISTENT_ENV_KEYS:
+                if worker_metadata.env.get(key) != job.metadata.env.get(key):
+                    raise RuntimeError(
+                        f"{key} changed on {transport.name} during the sweep: {worker_metadata.env.get(key)}"
+                    )
+
+            if worker_metadata.config != job.metadata.config:
+                raise RuntimeError(
+                    f"Config mismatch on {transport.name}: {worker_metadata.config}, expected {job.metadata.config}"
+                )
+
+            manifest = json.loads((staging_dir / MANIFEST_FILENAME).read_text())
+            if manifest["state"] != MANIFEST_STATE_COMPLETE:
+                raise RuntimeError(f"Job did not complete on {transport.name}")
+
+            with self.merge_lock:
+                merge_run_dir(
+                    staging_dir, self.releval_dir / "run" / job.exp_name, job.benchmark
+                )
+
+        if not self.keep_remote:
+            transport.remove(worker_run_dir)
+
+    def worker(self, transport: Transport, jobs: "Queue[Tuple[int, Job]]"):
+        while True:
+            try:
+                job_idx, job = jobs.get_nowait()
+            except Empty:
+                return
+
+            print(f"[{transport.name}] Running {job.exp_name}: {job.benchmark}")
+
+            try:
+                self.run_job(transport, job, job_idx)
+            except Exception as e:
+                print(f"[{transport.name}] {job.exp_name}: {job.benchmark} failed: {e}")
+                with self.merge_lock:
+                    self.failed_jobs.append((job, transport.name, str(e)))
+            else:
+                print(f"[{transport.name}] Finished {job.exp_name}: {job.benchmark}")
+
+    def run(self, jobs: List[Job], overwrite: bool = False):
+        experiments = {job.exp_name: job.metadata for job in jobs}
+        for exp_name, metadata in experiments.items():
+            self.prepare_run_dir(exp_name, metadata, overwrite)
+
+        # hosts pull jobs from a shared queue, so faster hosts take more jobs
+        queue: "Queue[Tuple[int, Job]]" = Queue()
+        for job_idx, job in enumerate(jobs):
+            queue.put((job_idx, job))
+
+        with ThreadPoolExecutor(max_workers=len(self.transports)) as executor:
+            for transport in self.transports:
+                executor.submit(self.worker, transport, queue)
+
+        failed_exps = set(job.exp_name for job, _, _ in self.failed_jobs)
+        for exp_name in experiments:
+            if exp_name not in failed_exps:
+                write_manifest(
+                    self.releval_dir / "run" / exp_name, MANIFEST_STATE_COMPLETE
+                )
+
+
+def make_jobs(
+    configs: List[Dict[str, Any]],
+    env: Dict[str, str],
+    benchmarks: List[str],
+    repeat: int,
+    name: Optional[str],
+) -> List[Job]:
+    jobs = []
+
+    for config in configs:
+        metadata = make_metadata(config, env)
+
+        exp_name = metadata.get_experiment_name()
+        if name is not None:
+            exp_name = f"{name}_{exp_name}" if len(configs) > 1 else name
+
+        for i in range(repeat):
+            name_i = f"{exp_name}_{i}" if repeat != 1 else exp_name
+            for benchmark in benchmarks:
+                jobs.append(Job(name_i, benchmark, metadata))
+
+    return jobs
+
+
+def main():
+    argparser = argparse.ArgumentParser()
+
+    for option in EXPERIMENT_OPTION_LIST:
+        if option.type == bool:
+            argparser.add_argument(
+                f"--{option.name}",
+                default=option.default,
+                action=argparse.BooleanOptionalAction,
+            )
+        else:
+            argparser.add_argument(
+                f"--{option.name}",
+                type=option.type,
+                default=option.default,
+                choices=option.choices,
+            )
+
+    argparser.add_argument("benchmarks", nargs="+")
+    argparser.add_argument(
+        "--host",
+        action="append",
+        required=True,
+        help="worker as [user@]host:releval_dir, or local:releval_dir",
+    )
+    argparser.add_argument(
+        "--sweep",
+        action="append",
+        default=[],
+        help="sweep an option over comma-separated values, e.g. parallaft_checkpoint_period=1000000000,5000000000",
+    )
+    argparser.add_argument("--name", type=str)
+    argparser.add_argument("--releval-dir", type=Path, default=Path(__file__).parent)
+    argparser.add_argument("--repeat", type=int, default=1)
+    argparser.add_argument("--overwrite", action="store_true")
+    argparser.add_argument("--dry-run", action="store_true")
+    argparser.add_argument("--keep-remote", action="store_true")
+    argparser.add_argument("--ssh-args", type=shlex.split, default=[])
+    argparser.add_argument(
+        "--worker-args",
+        type=shlex.split,
+        default=[],
+        help="extra arguments to run.py on workers, e.g. '--isolate'",
+    )
+    args = argparser.parse_args()
+
+    transports = [parse_host(h, args.ssh_args) for h in args.host]
+
+    base_config = {
+        option.name: getattr(args, option.name) for option in EXPERIMENT_OPTION_LIST
+    }
+    configs = parse_sweep(args.sweep, base_config)
+
+    envs = {t.name: get_worker_env(t) for t in transports}
+    env = check_env_consistency(envs)
+
+    jobs = make_jobs(configs, env, args.benchmarks, args.repeat, args.name)
+
+    print(f"Workers:\n{pformat(envs)}\n")
+    print(f"{len(jobs)} jobs on {len(transports)} workers")
+
+    if args.dry_run:
+        for job in jobs:
+            print(f"- {job.exp_name}: {job.benchmark}")
+        return
+
+    coordinator = Coordinator(
+        transports, args.releval_dir, args.worker_args, args.keep_remote
+    )
+    coordinator.run(jobs, args.overwrite)
+
+    if coordinator.failed_jobs:
+        print(f"\n{len(coordinator.failed_jobs)} jobs failed:")
+        for job, host, error in coordinator.failed_jobs:
+            print(f"- {job.exp_name}: {job.benchmark} on {host}: {error}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
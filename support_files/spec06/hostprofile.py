@@ -0,0 +1,145 @@
+#!/usr/bin/python3
+
+from typing import Dict, List, NamedTuple, Optional
+from pathlib import Path
+
+import argparse
+import os
+import shlex
+
+CPUINFO_PATH = Path("/proc/cpuinfo")
+
+HOST_PROFILE_FILENAME = "host_profile.env"
+
+# bump when the set of variables changes, spec_submit.sh refuses profiles of
+# other versions
+HOST_PROFILE_VERSION = 2
+
+# lscpu's names of the ARM implementer IDs
+ARM_IMPLEMENTERS = {
+    0x41: "ARM",
+    0x61: "Apple",
+}
+
+PERF_COUNTERS = ["instructions", "cycles", "energy-cores", "energy-pkg"]
+CACHE_TLB_PERF_COUNTERS = [
+    "ll-loads",
+    "ll-load-misses",
+    "ll-stores",
+    "ll-store-misses",
+    "dtlb-loads",
+    "dtlb-load-misses",
+    "dtlb-stores",
+    "dtlb-store-misses",
+]
+
+APPLE_HWMON_SENSOR_PATHS = [
+    "macsmc_hwmon/CPU P-cores Power",
+    "macsmc_hwmon/CPU E-cores Power",
+    "macsmc_hwmon/SoC Power",
+    "macsmc_hwmon/DRAM VDD2H Power",
+    "macsmc_hwmon/CPU SRAM 1 Power",
+    "macsmc_hwmon/CPU SRAM 2 Power",
+]
+
+
+class CpuId(NamedTuple):
+    arch: str
+    vendor: str
+    family: Optional[int]
+    model: Optional[int]
+
+
+def read_cpu_id(cpuinfo_path: Path = CPUINFO_PATH) -> CpuId:
+    info: Dict[str, str] = {}
+
+    # the first processor is representative, as hybrid CPUs share the same ID
+    for line in cpuinfo_path.read_text().splitlines():
+        if not line.strip():
+            if info:
+                break
+            continue
+        k, _, v = line.partition(":")
+        info.setdefault(k.strip(), v.strip())
+
+    arch = os.uname().machine
+
+    if "vendor_id" in info:
+        return CpuId(
+            arch, info["vendor_id"], int(info["cpu family"]), int(info["model"])
+        )
+
+    if "CPU implementer" in info:
+        implementer = int(info["CPU implementer"], 16)
+        return CpuId(
+            arch,
+            ARM_IMPLEMENTERS.get(implementer, hex(implementer)),
+            None,
+            int(info["CPU part"], 16) if "CPU part" in info else None,
+        )
+
+    return CpuId(arch, "", None, None)
+
+
+# Core sets are not part of the profile: they come from the core plan of
+# topology.py, or from the builtin table in spec_submit.sh, keyed on the CPU ID
+class HostProfile(NamedTuple):
+    cpu_id: CpuId
+    perf_counters: List[str]
+    cache_tlb_perf_counters: List[str]
+    hwmon_sensor_paths: List[str]
+
+    def to_shell(self) -> str:
+        variables = {
+            "HOST_PROFILE_VERSION": str(HOST_PROFILE_VERSION),
+            "HOST_ARCH": self.cpu_id.arch,
+            "HOST_CPU_VENDOR": self.cpu_id.vendor,
+            "HOST_CPU_FAMILY": (
+                "" if self.cpu_id.family is None else str(self.cpu_id.family)
+            ),
+            "HOST_CPU_MODEL": (
+                "" if self.cpu_id.model is None else str(self.cpu_id.model)
+            ),
+            "HOST_PERF_COUNTERS": ",".join(self.perf_counters),
+            "HOST_CACHE_TLB_PERF_COUNTERS": ",".join(self.cache_tlb_perf_counters),
+            "HOST_HWMON_SENSOR_PATHS": ",".join(self.hwmon_sensor_paths),
+        }
+
+        return "".join(f"{k}={shlex.quote(v)}\n" for k, v in variables.items())
+
+
+def make_host_profile(cpu_id: CpuId) -> HostProfile:
+    if cpu_id.arch == "x86_64":
+        return HostProfile(
+            cpu_id,
+            perf_counters=PERF_COUNTERS,
+            cache_tlb_perf_counters=CACHE_TLB_PERF_COUNTERS,
+            hwmon_sensor_paths=[],
+        )
+
+    return HostProfile(
+        cpu_id,
+        perf_counters=[],
+        cache_tlb_perf_counters=[],
+        hwmon_sensor_paths=(
+            APPLE_HWMON_SENSOR_PATHS
+            if cpu_id.arch == "aarch64" and cpu_id.vendor == "Apple"
+            else []
+        ),
+    )
+
+
+def detect_host_profile() -> HostProfile:
+    return make_host_profile(read_cpu_id())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cpuinfo", type=Path, default=CPUINFO_PATH)
+    args = parser.parse_args()
+
+    print(make_host_profile(read_cpu_id(args.cpuinfo)).to_shell(), end="")
+
+
+if __name__ == "__main__":
+    main()
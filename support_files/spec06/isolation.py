@@ -0,0 +1,236 @@
+from typing import Dict, Iterator, List, NamedTuple, Optional, Set
+from contextlib import contextmanager
+from pathlib import Path
+
+import os
+import time
+
+from topology import SYSFS_CPU_DIR, format_cpu_list, parse_cpu_list
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+CGROUP_NAME = "releval"
+PROC_IRQ_DIR = Path("/proc/irq")
+INTEL_NOTURBO_PATH = SYSFS_CPU_DIR / "intel_pstate/no_turbo"
+
+PF_KTHREAD = 0x00200000
+
+# how long the isolated CPUs are watched for other tasks before the run
+TASK_SAMPLE_DURATION = 1.0
+TASK_SAMPLE_INTERVAL = 0.05
+
+
+class SavedValue(NamedTuple):
+    path: Path
+    value: str
+
+
+class InterferingTask(NamedTuple):
+    pid: int
+    tid: int
+    comm: str
+    cpu: int
+
+
+def get_online_cpus() -> List[int]:
+    return parse_cpu_list((SYSFS_CPU_DIR / "online").read_text())
+
+
+def write_saved(path: Path, value: str, saved: List[SavedValue]):
+    old_value = path.read_text().strip()
+    if old_value == value:
+        return
+    path.write_text(value)
+    saved.append(SavedValue(path, old_value))
+
+
+def restore_saved(saved: List[SavedValue]):
+    for path, value in reversed(saved):
+        try:
+            path.write_text(value)
+        except OSError as e:
+            print(f"Warning: failed to restore {path} to {value}: {e}")
+
+
+def format_cpu_mask(cpus: List[int]) -> str:
+    # the kernel's cpumask format, comma-separated 32-bit hex groups
+    mask = sum(1 << cpu for cpu in cpus)
+    nr_groups = max(cpus) // 32 + 1
+    return ",".join(
+        f"{(mask >> (32 * i)) & 0xFFFFFFFF:08x}" for i in reversed(range(nr_groups))
+    )
+
+
+def steer_irqs(housekeeping_cpus: List[int], saved: List[SavedValue]):
+    cpu_list = format_cpu_list(housekeeping_cpus)
+
+    for irq_dir in sorted(PROC_IRQ_DIR.iterdir()):
+        affinity_path = irq_dir / "smp_affinity_list"
+        if not affinity_path.exists():
+            continue
+
+        try:
+            write_saved(affinity_path, cpu_list, saved)
+        except OSError:
+            # per-CPU and managed IRQs can't be moved
+            pass
+
+    try:
+        write_saved(
+            PROC_IRQ_DIR / "default_smp_affinity",
+            format_cpu_mask(housekeeping_cpus),
+            saved,
+        )
+    except OSError as e:
+        print(f"Warning: failed to set the default IRQ affinity: {e}")
+
+
+def set_cpufreq_governor(cpus: List[int], governor: str, saved: List[SavedValue]):
+    for cpu in cpus:
+        path = SYSFS_CPU_DIR / f"cpu{cpu}/cpufreq/scaling_governor"
+        if path.exists():
+            write_saved(path, governor, saved)
+
+
+def create_cpuset_cgroup(cpus: List[int]):
+    if "cpuset" not in (CGROUP_ROOT / "cgroup.controllers").read_text().split():
+        raise RuntimeError("cpuset controller is not available in cgroup v2")
+
+    (CGROUP_ROOT / "cgroup.subtree_control").write_text("+cpuset")
+
+    cgroup = CGROUP_ROOT / CGROUP_NAME
+    cgroup.mkdir(exist_ok=True)
+
+    (cgroup / "cpuset.cpus").write_text(format_cpu_list(cpus))
+    (cgroup / "cpuset.mems").write_text(
+        (CGROUP_ROOT / "cpuset.mems.effective").read_text().strip()
+    )
+
+    # an exclusive partition takes the CPUs away from all other cgroups
+    (cgroup / "cpuset.cpus.partition").write_text("root")
+    partition = (cgroup / "cpuset.cpus.partition").read_text().strip()
+    if partition != "root":
+        raise RuntimeError(f"Failed to create exclusive cpuset partition: {partition}")
+
+
+def remove_cpuset_cgroup(cgroup: Path):
+    if not cgroup.exists():
+        return
+
+    (cgroup / "cpuset.cpus.partition").write_text("member")
+    cgroup.rmdir()
+
+
+def sample_running_tasks(cpu_set: Set[int], own_pid: int) -> List[InterferingTask]:
+    tasks = []
+
+    for proc_dir in Path("/proc").iterdir():
+        if not proc_dir.name.isdigit():
+            continue
+
+        try:
+            if int(proc_dir.name) == own_pid:
+                continue
+
+            for task_dir in (proc_dir / "task").iterdir():
+                stat = (task_dir / "stat").read_text()
+                comm = stat[stat.index("(") + 1 : stat.rindex(")")]
+                fields = stat[stat.rindex(")") + 2 :].split()
+
+                state = fields[0]
+                flags = int(fields[6])
+                cpu = int(fields[36])
+
+                if flags & PF_KTHREAD or state != "R" or cpu not in cpu_set:
+                    continue
+
+                tasks.append(
+                    InterferingTask(int(proc_dir.name), int(task_dir.name), comm, cpu)
+                )
+        except (OSError, ValueError, IndexError):
+            # the task exited while we were looking at it
+            continue
+
+    return tasks
+
+
+def find_interfering_tasks(
+    cpus: List[int],
+    duration: float = TASK_SAMPLE_DURATION,
+    interval: float = TASK_SAMPLE_INTERVAL,
+) -> List[InterferingTask]:
+    # a single snapshot misses tasks that only wake up now and then, so the
+    # CPUs are sampled repeatedly. This can still miss short-lived tasks, it
+    # only catches the common sources of noise.
+    cpu_set: Set[int] = set(cpus)
+    own_pid = os.getpid()
+    tasks: Dict[int, InterferingTask] = {}
+
+    deadline = time.monotonic() + duration
+    while True:
+        for task in sample_running_tasks(cpu_set, own_pid):
+            tasks.setdefault(task.tid, task)
+
+        if time.monotonic() >= deadline:
+            break
+        time.sleep(interval)
+
+    return list(tasks.values())
+
+
+@contextmanager
+def intel_noturbo() -> Iterator[None]:
+    saved: List[SavedValue] = []
+
+    try:
+        write_saved(INTEL_NOTURBO_PATH, "1", saved)
+        yield
+    finally:
+        restore_saved(saved)
+
+
+# Yields the cgroup that the measured commands are to be moved into, see
+# RELEVAL_CGROUP in spec_submit.sh. The harness itself stays on the
+# housekeeping CPUs.
+@contextmanager
+def isolated_cpus(
+    cpus: List[int],
+    governor: Optional[str] = "performance",
+    irqs: bool = True,
+    cgroup: bool = True,
+) -> Iterator[Optional[Path]]:
+    housekeeping_cpus = [cpu for cpu in get_online_cpus() if cpu not in cpus]
+
+    if len(housekeeping_cpus) == 0:
+        raise RuntimeError("No CPU is left for housekeeping after isolation")
+
+    saved: List[SavedValue] = []
+    cgroup_path = CGROUP_ROOT / CGROUP_NAME
+
+    try:
+        if governor is not None:
+            set_cpufreq_governor(cpus, governor, saved)
+
+        if irqs:
+            steer_irqs(housekeeping_cpus, saved)
+
+        if cgroup:
+            create_cpuset_cgroup(cpus)
+
+        interfering_tasks = find_interfering_tasks(cpus)
+
+        print(
+            f"Isolated CPUs {format_cpu_list(cpus)}, "
+            f"housekeeping on CPUs {format_cpu_list(housekeeping_cpus)}"
+        )
+
+        for task in interfering_tasks:
+            print(
+                f"Warning: task {task.comm} (pid {task.pid}, tid {task.tid}) was seen running on isolated CPU {task.cpu}"
+            )
+
+        yield cgroup_path if cgroup else None
+    finally:
+        if cgroup:
+            remove_cpuset_cgroup(cgroup_path)
+
+        restore_saved(saved)
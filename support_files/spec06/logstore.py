@@ -0,0 +1,391 @@
+#!/usr/bin/python3
+
+from typing import IO, Iterator, List, NamedTuple, Optional, Set, Tuple
+from pathlib import Path
+
+import argparse
+import hashlib
+import io
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+ZSTD_SUFFIX = ".zst"
+ZSTD_LEVEL = 3
+
+CORE_STORE_FILENAME = "cores.sqlite"
+
+# core dumps are split into chunks of the page size, so that pages shared
+# between the main and its checkers are only stored once
+CHUNK_SIZE = os.sysconf("SC_PAGE_SIZE")
+DIGEST_SIZE = hashlib.sha256().digest_size
+ZERO_DIGEST = bytes(DIGEST_SIZE)
+
+RETENTION_POLICIES = ["all", "failed", "none"]
+
+# per sub-run log files removed by retention policies, the small .cmd, .env.txt
+# and .run_id.txt files are always kept as collect_stats reads them
+SUB_RUN_LOG_SUFFIXES = [".log", ".strace.log", ".mpk"]
+
+
+# sub-run logs compressed by store_run_logs
+SUB_RUN_COMPRESSED_LOG_SUFFIXES = [".log", ".strace.log"]
+
+
+class LogPolicy(NamedTuple):
+    compress: bool = True
+    retention: str = "all"
+    # core dumps kept by the retention policy are deduplicated into the store
+    dedup_cores: bool = True
+
+
+def get_zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError(
+            "zstandard is required for compressed logs, install python3-zstandard"
+        )
+
+    return zstandard
+
+
+def has_zstd() -> bool:
+    try:
+        get_zstd()
+    except RuntimeError:
+        return False
+    return True
+
+
+def resolve_log_path(path: Path) -> Path:
+    if not path.exists():
+        compressed_path = path.with_name(path.name + ZSTD_SUFFIX)
+        if compressed_path.exists():
+            return compressed_path
+    return path
+
+
+def open_log(path: Path) -> IO[bytes]:
+    path = resolve_log_path(path)
+    f = open(path, "rb")
+
+    if path.name.endswith(ZSTD_SUFFIX):
+        return get_zstd().ZstdDecompressor().stream_reader(f, closefd=True)  # type: ignore
+
+    return f
+
+
+def open_text_log(path: Path) -> IO[str]:
+    return io.TextIOWrapper(
+        open_log(path), encoding="utf-8", errors="replace"  # type: ignore
+    )
+
+
+def compress_file(path: Path, level: int = ZSTD_LEVEL) -> Path:
+    zstd = get_zstd()
+    out_path = path.with_name(path.name + ZSTD_SUFFIX)
+
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{out_path.name}.")
+    try:
+        with open(path, "rb") as src, os.fdopen(fd, "wb") as dst:
+            zstd.ZstdCompressor(level=level).copy_stream(src, dst)
+
+        shutil.copystat(path, tmp_path)
+        os.replace(tmp_path, out_path)
+    except:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+    path.unlink()
+    return out_path
+
+
+class CoreStore:
+    def __init__(self, path: Path):
+        self.db = sqlite3.connect(path, timeout=600)
+        self.db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (digest BLOB PRIMARY KEY, data BLOB);
+            CREATE TABLE IF NOT EXISTS files (
+                name TEXT PRIMARY KEY, size INTEGER, chunk_size INTEGER, digests BLOB
+            );
+            """
+        )
+
+    def close(self):
+        self.db.close()
+
+    def add_file(self, name: str, path: Path) -> Tuple[int, int]:
+        compressor = get_zstd().ZstdCompressor(level=ZSTD_LEVEL)
+        digests = bytearray()
+        nr_chunks = 0
+        nr_new_chunks = 0
+
+        with self.db, open(path, "rb") as f:
+            while chunk := f.read(CHUNK_SIZE):
+                nr_chunks += 1
+
+                if chunk.count(0) == len(chunk):
+                    digests += ZERO_DIGEST
+                    continue
+
+                digest = hashlib.sha256(chunk).digest()
+                digests += digest
+
+                cur = self.db.execute(
+                    "INSERT OR IGNORE INTO chunks VALUES (?, ?)",
+                    (digest, compressor.compress(chunk)),
+                )
+                nr_new_chunks += cur.rowcount
+
+            self.db.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                (name, path.stat().st_size, CHUNK_SIZE, bytes(digests)),
+            )
+
+        return nr_chunks, nr_new_chunks
+
+    def names(self, prefix: str = "") -> List[str]:
+        return [
+            row[0]
+            for row in self.db.execute(
+                "SELECT name FROM files WHERE substr(name, 1, ?) = ? ORDER BY name",
+                (len(prefix), prefix),
+            )
+        ]
+
+    def iter_file(self, name: str) -> Iterator[bytes]:
+        decompressor = get_zstd().ZstdDecompressor()
+
+        row = self.db.execute(
+            "SELECT size, chunk_size, digests FROM files WHERE name = ?", (name,)
+        ).fetchone()
+
+        if row is None:
+            raise KeyError(name)
+
+        size, chunk_size, digests = row
+
+        for i in range(0, len(digests), DIGEST_SIZE):
+            digest = digests[i : i + DIGEST_SIZE]
+            length = min(chunk_size, size - i // DIGEST_SIZE * chunk_size)
+
+            if digest == ZERO_DIGEST:
+                yield bytes(length)
+                continue
+
+            (data,) = self.db.execute(
+                "SELECT data FROM chunks WHERE digest = ?", (digest,)
+            ).fetchone()
+            yield decompressor.decompress(data)
+
+    def restore_file(self, name: str, out_path: Path):
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(out_path, "wb") as f:
+            for chunk in self.iter_file(name):
+                f.write(chunk)
+
+    def remove_files(self, prefix: str) -> int:
+        with self.db:
+            return self.db.execute(
+                "DELETE FROM files WHERE substr(name, 1, ?) = ?", (len(prefix), prefix)
+            ).rowcount
+
+    def merge(self, other_path: Path):
+        self.db.execute("ATTACH DATABASE ? AS other", (str(other_path),))
+        try:
+            with self.db:
+                self.db.execute(
+                    "INSERT OR IGNORE INTO chunks SELECT * FROM other.chunks"
+                )
+                self.db.execute(
+                    "INSERT OR REPLACE INTO files SELECT * FROM other.files"
+                )
+        finally:
+            self.db.execute("DETACH DATABASE other")
+
+    def gc(self) -> int:
+        referenced: Set[bytes] = set()
+        for (digests,) in self.db.execute("SELECT digests FROM files"):
+            for i in range(0, len(digests), DIGEST_SIZE):
+                referenced.add(digests[i : i + DIGEST_SIZE])
+
+        unreferenced = [
+            digest
+            for (digest,) in self.db.execute("SELECT digest FROM chunks")
+            if digest not in referenced
+        ]
+
+        if not unreferenced:
+            return 0
+
+        with self.db:
+            self.db.executemany(
+                "DELETE FROM chunks WHERE digest = ?", ((d,) for d in unreferenced)
+            )
+
+        self.db.execute("VACUUM")
+        return len(unreferenced)
+
+
+def store_cores(core_dir: Path, store_path: Optional[Path] = None):
+    # moves the core dumps of a sub-run into the experiment-wide store
+    if store_path is None:
+        store_path = core_dir.parent / CORE_STORE_FILENAME
+
+    store = CoreStore(store_path)
+    try:
+        for p in sorted(core_dir.rglob("*")):
+            if p.is_file():
+                nr_chunks, nr_new_chunks = store.add_file(
+                    str(p.relative_to(core_dir.parent)), p
+                )
+                print(
+                    f"Stored {p.name}: {nr_new_chunks} of {nr_chunks} chunks are new",
+                    file=sys.stderr,
+                )
+    finally:
+        store.close()
+
+    shutil.rmtree(core_dir)
+
+
+def get_exit_status(stats_path: Path) -> Optional[int]:
+    try:
+        for line in stats_path.read_text().splitlines():
+            k, _, v = line.partition("=")
+            if k == "timing.exit_status":
+                return int(v)
+    except (FileNotFoundError, ValueError):
+        pass
+
+    return None
+
+
+def get_sub_runs(run_dir: Path) -> List[str]:
+    # every sub-run records its run ID, regardless of the action
+    return sorted(
+        p.name.removesuffix(".run_id.txt")
+        for p in (run_dir / "log").glob("*.run_id.txt")
+    )
+
+
+def apply_retention(run_dir: Path, policy: str):
+    if policy not in RETENTION_POLICIES:
+        raise ValueError(f"Unknown retention policy {policy}")
+
+    if policy == "all":
+        return
+
+    log_dir = run_dir / "log"
+    store_path = log_dir / CORE_STORE_FILENAME
+    store = CoreStore(store_path) if store_path.exists() else None
+    nr_removed_files = 0
+
+    try:
+        for sub_run in get_sub_runs(run_dir):
+            if policy == "failed":
+                exit_status = get_exit_status(
+                    run_dir / "result" / f"{sub_run}.stats.txt"
+                )
+                if exit_status is None or exit_status != 0:
+                    continue
+
+            for suffix in SUB_RUN_LOG_SUFFIXES:
+                for name in (sub_run + suffix, sub_run + suffix + ZSTD_SUFFIX):
+                    (log_dir / name).unlink(missing_ok=True)
+
+            shutil.rmtree(log_dir / f"{sub_run}.cores", ignore_errors=True)
+
+            if store is not None:
+                nr_removed_files += store.remove_files(f"{sub_run}.cores/")
+
+        # only rewrites the store when chunks may have been freed
+        if store is not None and nr_removed_files > 0:
+            store.gc()
+    finally:
+        if store is not None:
+            store.close()
+
+
+def store_run_logs(run_dir: Path, policy: LogPolicy):
+    # done once the SPEC run has finished rather than by spec_submit.sh after
+    # each sub-run, to keep it out of the measured teardown
+    log_dir = run_dir / "log"
+
+    for sub_run in get_sub_runs(run_dir):
+        if policy.compress:
+            for suffix in SUB_RUN_COMPRESSED_LOG_SUFFIXES:
+                path = log_dir / (sub_run + suffix)
+                if path.exists():
+                    compress_file(path)
+
+        core_dir = log_dir / f"{sub_run}.cores"
+        if policy.dedup_cores and core_dir.is_dir():
+            store_cores(core_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    p = subparsers.add_parser("compress", help="compress log files in place")
+    p.add_argument("files", nargs="+", type=Path)
+
+    p = subparsers.add_parser(
+        "cat", help="print a log file, decompressing it if needed"
+    )
+    p.add_argument("file", type=Path)
+
+    p = subparsers.add_parser(
+        "store-cores", help="move a core dump directory into the deduplicated store"
+    )
+    p.add_argument("core_dir", type=Path)
+    p.add_argument("--store", type=Path)
+
+    p = subparsers.add_parser("list-cores", help="list stored core dumps")
+    p.add_argument("store", type=Path)
+    p.add_argument("prefix", nargs="?", default="")
+
+    p = subparsers.add_parser("restore-cores", help="restore stored core dumps")
+    p.add_argument("store", type=Path)
+    p.add_argument("prefix")
+    p.add_argument("--output-dir", type=Path, default=Path("."))
+
+    p = subparsers.add_parser("prune", help="apply a retention policy to a run")
+    p.add_argument("run_dir", type=Path)
+    p.add_argument("--policy", choices=RETENTION_POLICIES, required=True)
+
+    args = parser.parse_args()
+
+    if args.command == "compress":
+        for f in args.files:
+            compress_file(f)
+    elif args.command == "cat":
+        with open_log(args.file) as f:
+            shutil.copyfileobj(f, sys.stdout.buffer)
+    elif args.command == "store-cores":
+        store_cores(args.core_dir, args.store)
+    elif args.command == "list-cores":
+        store = CoreStore(args.store)
+        for name in store.names(args.prefix):
+            print(name)
+        store.close()
+    elif args.command == "restore-cores":
+        store = CoreStore(args.store)
+        for name in store.names(args.prefix):
+            store.restore_file(name, args.output_dir / name)
+            print(f"Restored {args.output_dir / name}")
+        store.close()
+    elif args.command == "prune":
+        apply_retention(args.run_dir, args.policy)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 #!/usr/bin/python3
 
 from typing import (
+    TYPE_CHECKING,
     Literal,
     NamedTuple,
     Dict,
@@ -12,29 +13,44 @@ from typing import (
     TypeVar,
     Generic,
     Optional,
+    Sequence,
 )
 from functools import partial
 from socket import gethostname
 from typing import TypeVar
 from pathlib import Path
-from dataclasses_json import dataclass_json
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
+from functools import lru_cache
 from pprint import pformat
 
 import subprocess
 import argparse
-from filelock import FileLock, Timeout
-import subprocess_tee
+import json
+import shlex
+import hashlib
+import tempfile
 import re
 import os
-import prctl
+import shutil
+import sys
 import signal
+import time
+import queue
+from contextlib import ExitStack
+
+# the harness modules are imported where they are used, so that importing this
+# module (e.g. from fanout.py) stays cheap
+if TYPE_CHECKING:
+    from admission import AdmissionPolicy
+    from logstore import LogPolicy
+    from topology import CoreAllocPlan
 
 
 class SPECRunResult(NamedTuple):
     result_paths: List[Path]
     stdout: str
     stderr: str
+    failures: Tuple[str, ...] = ()
 
 
 def run_spec(
@@ -70,6 +86,9 @@ def run_spec(
         "PATH": str((spec_dir / "bin").resolve().absolute()) + ":" + os.environ["PATH"],
     }
 
+    import prctl
+    import subprocess_tee
+
     output = subprocess_tee.run(
         runcpu_args,
         check=True,
@@ -83,8 +102,215 @@ def run_spec(
 
     result_paths = [Path(m.groups()[0]) for m in result_path_matches]
 
+    # subprocess_tee returns None for an empty stderr
+    return SPECRunResult(
+        result_paths=result_paths, stdout=output.stdout, stderr=output.stderr or ""
+    )
+
+
+def run_spec_concurrently(
+    footprints: Dict[str, Optional[int]],
+    runcpu_args: List[str],
+    runcpu_env: Dict[str, str],
+    exp_name: str,
+    spec_dir: Path,
+    spec_ver: Literal["2017"] | Literal["2006"],
+    admission_policy: "AdmissionPolicy",
+    core_plans: Sequence["CoreAllocPlan"] = (),
+) -> SPECRunResult:
+    from admission import Job, MemoryAdmission, format_bytes
+
+    # each running benchmark takes a core plan of its own, so that concurrent
+    # benchmarks never share CPUs. run_experiment limits the number of jobs to
+    # the number of plans
+    free_core_plans: "queue.Queue[CoreAllocPlan]" = queue.Queue()
+    for plan in core_plans:
+        free_core_plans.put(plan)
+
+    def run_job(job: Job) -> SPECRunResult:
+        if not core_plans:
+            return run_spec(
+                [job.name], runcpu_args, runcpu_env, exp_name, spec_dir, spec_ver
+            )
+
+        plan = free_core_plans.get()
+        try:
+            return run_spec(
+                [job.name],
+                runcpu_args,
+                {**runcpu_env, **plan.to_env()},
+                exp_name,
+                spec_dir,
+                spec_ver,
+            )
+        finally:
+            free_core_plans.put(plan)
+
+    # one runspec invocation per benchmark, started as memory allows
+    admission = MemoryAdmission(admission_policy)
+    print(
+        f"Running up to {admission_policy.max_jobs} benchmarks at once within {format_bytes(admission.budget)}"
+    )
+
+    results = admission.run(
+        [Job(name, footprint) for name, footprint in footprints.items()], run_job
+    )
+
     return SPECRunResult(
-        result_paths=result_paths, stdout=output.stdout, stderr=output.stderr
+        result_paths=[p for r in results for p in r.result_paths],
+        stdout="".join(r.stdout for r in results),
+        stderr="".join(r.stderr for r in results),
+    )
+
+
+class Workload(NamedTuple):
+    name: str
+    command: List[str]
+    stdin: Optional[Path]
+    cwd: Optional[Path]
+    repeat: Optional[int]
+
+    @property
+    def run_hash(self) -> str:
+        # identifies the command like the run hashes of SPEC sub-runs, so that
+        # changing a workload's command doesn't mix up its results
+        run_id = shlex.join(self.command)
+        if self.stdin is not None:
+            run_id += f" < {self.stdin.name}"
+        return hashlib.md5(run_id.encode()).hexdigest()[:6]
+
+
+def load_manifest(path: Path) -> List[Workload]:
+    text = path.read_text()
+
+    if path.suffix in (".yml", ".yaml"):
+        import yaml
+
+        manifest = yaml.safe_load(text)
+    else:
+        manifest = json.loads(text)
+
+    base_dir = path.parent.resolve()
+
+    def resolve(p: Optional[str]) -> Optional[Path]:
+        if p is None:
+            return None
+        return base_dir / Path(p).expanduser()
+
+    workloads = []
+    for w in manifest["workloads"]:
+        command = w["command"]
+        if isinstance(command, str):
+            command = shlex.split(command)
+
+        workloads.append(
+            Workload(
+                name=w.get("name", Path(command[0]).name),
+                command=command,
+                stdin=resolve(w.get("stdin")),
+                cwd=resolve(w.get("cwd")),
+                repeat=w.get("repeat"),
+            )
+        )
+
+    names = [w.name for w in workloads]
+    for name in names:
+        if names.count(name) > 1:
+            raise ValueError(f"Duplicate workload name {name} in {path}")
+
+    return workloads
+
+
+def write_workload_list(run_dir: Path, workloads: List[Workload]):
+    # lets collect_stats.py treat workloads like SPEC benchmarks
+    write_file_atomic(
+        run_dir / WORKLOADS_FILENAME,
+        json.dumps(
+            [
+                {"name": w.name, "filename": w.name, "sub_run_hashes": [w.run_hash]}
+                for w in workloads
+            ],
+            indent=2,
+        ),
+    )
+
+
+def get_submit_defines(runcpu_args: List[str]) -> Dict[str, str]:
+    defines = {"verb": "run", "parallaft_xargs": ""}
+
+    for flag, define in zip(runcpu_args, runcpu_args[1:]):
+        if flag == "--define":
+            k, v = define.split("=", 1)
+            defines[k] = v
+
+    return defines
+
+
+def run_workloads(
+    workloads: List[Workload],
+    runcpu_args: List[str],
+    runcpu_env: Dict[str, str],
+    exp_name: str,
+    spec_dir: Path,
+    releval_dir: Path,
+):
+    defines = get_submit_defines(runcpu_args)
+    submit_bin = releval_dir / "scripts" / "spec_submit.sh"
+
+    env = {
+        **os.environ,
+        **runcpu_env,
+        "SPEC": str(spec_dir.resolve().absolute()),
+        "LC_ALL": "C",
+        "LC_LANG": "C",
+        "RELEVAL_EXP_NAME": exp_name,
+    }
+
+    import prctl
+
+    stdout = ""
+    stderr = ""
+    failures = []
+
+    for workload in workloads:
+        submit_args = (
+            [str(submit_bin), defines["verb"]]
+            + shlex.split(defines["parallaft_xargs"])
+            + ["--"]
+            + workload.command
+        )
+
+        print(f"Running workload {workload.name}: {shlex.join(workload.command)}")
+
+        with open(workload.stdin or os.devnull, "rb") as stdin:
+            output = subprocess.run(
+                submit_args,
+                stdin=stdin,
+                capture_output=True,
+                text=True,
+                env={
+                    **env,
+                    "RELEVAL_RUN_NAME": f"{workload.name}.releval",
+                    "RELEVAL_RUN_HASH": workload.run_hash,
+                },
+                cwd=workload.cwd,
+                preexec_fn=lambda: prctl.set_pdeathsig(signal.SIGKILL),  # type: ignore
+            )
+
+        print(output.stdout, end="")
+        print(output.stderr, end="")
+
+        if output.returncode != 0:
+            print(
+                f"Error: workload {workload.name} exited with status {output.returncode}"
+            )
+            failures.append(workload.name)
+
+        stdout += output.stdout
+        stderr += output.stderr
+
+    return SPECRunResult(
+        result_paths=[], stdout=stdout, stderr=stderr, failures=tuple(failures)
     )
 
 
@@ -99,18 +325,74 @@ def get_parallaft_ver():
     return parallaft_ver
 
 
-def get_run_env() -> Dict[str, str]:
+RUN_ENV_CACHE_PATH = (
+    Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+    / "releval"
+    / "run_env.json"
+)
+BOOT_ID_PATH = Path("/proc/sys/kernel/random/boot_id")
+
+
+def get_parallaft_ver_cache_key() -> Optional[List[Any]]:
+    parallaft_bin = shutil.which("parallaft")
+    if parallaft_bin is None:
+        return None
+
+    st = Path(parallaft_bin).resolve().stat()
+
+    try:
+        boot_id = BOOT_ID_PATH.read_text().strip()
+    except OSError:
+        boot_id = None
+
+    return [boot_id, str(Path(parallaft_bin).resolve()), st.st_mtime_ns, st.st_size]
+
+
+def get_parallaft_ver_cached() -> str:
+    # `parallaft --version` only changes with the binary, so it is cached per
+    # boot and binary to keep sweep planning from forking it for every config
+    key = get_parallaft_ver_cache_key()
+
+    if key is not None:
+        try:
+            cache = json.loads(RUN_ENV_CACHE_PATH.read_text())
+            if cache["key"] == key:
+                return cache["parallaft_ver"]
+        except (OSError, ValueError, KeyError):
+            pass
+
     parallaft_ver = get_parallaft_ver()
 
+    if key is not None:
+        try:
+            RUN_ENV_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+            write_file_atomic(
+                RUN_ENV_CACHE_PATH,
+                json.dumps({"key": key, "parallaft_ver": parallaft_ver}),
+            )
+        except OSError:
+            pass
+
+    return parallaft_ver
+
+
+@lru_cache(maxsize=None)
+def _get_run_env() -> Tuple[Tuple[str, str], ...]:
+    parallaft_ver = get_parallaft_ver_cached()
+
     if parallaft_ver.endswith("-dirty"):
         raise RuntimeError(
             f"Using dirty parallaft version {parallaft_ver} is forbidden"
         )
-    return {
-        "parallaft_ver": parallaft_ver,
-        "kernel_ver": subprocess.check_output(["uname", "-r"]).decode("utf-8").strip(),
-        "hostname": gethostname(),
-    }
+    return (
+        ("parallaft_ver", parallaft_ver),
+        ("kernel_ver", os.uname().release),
+        ("hostname", gethostname()),
+    )
+
+
+def get_run_env() -> Dict[str, str]:
+    return dict(_get_run_env())
 
 
 T = TypeVar("T")
@@ -231,10 +513,26 @@ def apply_env(env_name: str, env_formatter: Callable[[T], str] = str) -> Applier
     return partial(inner, env_name, env_formatter)
 
 
+# runtime-mode variants compared against full Parallaft by --ablation, see
+# ABLATION_VARIANT_LIST in tools/collect_stats.py
+ABLATION_VARIANTS = [
+    "parallaft_nofork",
+    "parallaft_nomemcheck",
+    "parallaft_dynslicing",
+    "parallaft_dyncpufreq",
+    "parallaft_dyn2",
+]
+ABLATION_REFERENCE_MODES = ["base", "parallaft"]
+
+
 def bool_to_str(v: bool) -> str:
     return "1" if v else "0"
 
 
+def apply_nothing(value: Any, runcpu_args: List[str], env: Dict[str, str]):
+    pass
+
+
 EXPERIMENT_OPTION_LIST: List[OptionField] = [
     (
         OPT_MODE := OptionField(
@@ -293,6 +591,13 @@ EXPERIMENT_OPTION_LIST: List[OptionField] = [
             apply_env("RELEVAL_PARALLAFT_COUNT_CACHE_TLB_EVENTS", bool_to_str),
         )
     ),
+    (
+        # builtin uses the hand-picked CPU sets in spec_submit.sh, auto plans
+        # them from the detected topology for Parallaft modes, see main()
+        OPT_CORE_PLAN := OptionField(
+            "core_plan", str, "builtin", ["builtin", "auto"], apply_nothing
+        )
+    ),
 ]
 
 has_intel_turbo = False
@@ -305,7 +610,8 @@ if Path("/sys/devices/system/cpu/intel_pstate/no_turbo").exists():
                 bool,
                 False,
                 None,
-                apply_env("RELEVAL_INTEL_NOTURBO", bool_to_str),
+                # set by run.py for the whole experiment, see main()
+                apply_nothing,
             )
         )
     ]
@@ -315,12 +621,73 @@ EXPERIMENT_OPTION_MAP: Dict[str, OptionField] = {
     option.name: option for option in EXPERIMENT_OPTION_LIST
 }
 
+# spellings accepted on the command line besides --<option name>
+EXPERIMENT_OPTION_ALIASES = {OPT_CORE_PLAN.name: ["--core-plan"]}
+
 
 META_FILENAME = "meta.json"
+CORE_PLAN_FILENAME = "core_plan.json"
 LOCK_FILENAME = "experiment.lock"
+MANIFEST_FILENAME = "manifest.json"
+HARNESS_FILENAME = "harness.txt"
+
+MANIFEST_STATE_RUNNING = "running"
+MANIFEST_STATE_COMPLETE = "complete"
+MANIFEST_STATE_FAILED = "failed"
+WORKLOADS_FILENAME = "workloads.json"
+
+
+def write_file_atomic(path: Path, content: str, exclusive: bool = False):
+    # write to a temporary file in the same directory and rename it in place, so
+    # that readers either see the old content or the complete new content
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        os.fchmod(fd, 0o644)
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+
+        if exclusive:
+            # unlike rename, link fails if the target already exists
+            os.link(tmp_path, path)
+            os.unlink(tmp_path)
+        else:
+            os.replace(tmp_path, path)
+    except:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(partial(f.read, 1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def write_manifest(run_dir: Path, state: str):
+    files = {}
+    run_result_dir = run_dir / "result"
+
+    if state != MANIFEST_STATE_RUNNING and run_result_dir.exists():
+        for p in sorted(run_result_dir.iterdir()):
+            # skip temporary files of interrupted runs, and raw SPEC results
+            # that are only linked into the result directory
+            if p.name.endswith(".tmp") or p.is_symlink() or not p.is_file():
+                continue
+            files[str(p.relative_to(run_dir))] = sha256_file(p)
+
+    write_file_atomic(
+        run_dir / MANIFEST_FILENAME,
+        json.dumps({"state": state, "files": files}, indent=2),
+    )
 
 
-@dataclass_json
 @dataclass
 class Metadata:
     config: Dict[str, Any]
@@ -329,6 +696,14 @@ class Metadata:
     def __post_init__(self):
         self.cleanup()
 
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def from_json(cls, s: str) -> "Metadata":
+        d = json.loads(s)
+        return cls(d["config"], d["env"])
+
     def cleanup(self):
         mode = self.config[OPT_MODE.name]
 
@@ -338,6 +713,8 @@ class Metadata:
                 OPT_PARALLAFT_CORE_ALLOC,
                 OPT_PARALLAFT_NO_LOG,
                 OPT_PARALLAFT_COUNT_CACHE_TLB_EVENTS,
+                # base runs on the builtin main CPU set, see main()
+                OPT_CORE_PLAN,
             ]
 
             for option in options_to_delete:
@@ -350,7 +727,11 @@ class Metadata:
                 del self.env["parallaft_ver"]
             except:
                 pass
-        elif mode == "parallaft_raft":
+        else:
+            # experiments from before the core plan option used the builtin one
+            self.config.setdefault(OPT_CORE_PLAN.name, "builtin")
+
+        if mode == "parallaft_raft":
             try:
                 del self.config[OPT_PARALLAFT_CHECKPOINT_PERIOD.name]
             except:
@@ -382,6 +763,10 @@ class Metadata:
 
             name += f"_{core_alloc}_parallaft-{parallaft_ver}"
 
+        # builtin CPU sets keep the names of the experiments in the paper
+        if self.config.get(OPT_CORE_PLAN.name, "builtin") == "auto":
+            name += "_auto-cores"
+
         return name
 
     def get_spec_cmd_and_env(self) -> Tuple[List[str], Dict[str, str]]:
@@ -402,6 +787,57 @@ class Metadata:
         return f"Config:\n{display_dict(self.config)}\n\nEnvironment:\n{display_dict(self.env)}"
 
 
+def make_metadata(
+    config: Dict[str, Any], env: Optional[Dict[str, str]] = None
+) -> Metadata:
+    full_config = {option.name: option.default for option in EXPERIMENT_OPTION_LIST}
+
+    for name, value in config.items():
+        if name not in EXPERIMENT_OPTION_MAP:
+            raise ValueError(f"Unknown option {name}")
+        EXPERIMENT_OPTION_MAP[name].validate(value)
+        full_config[name] = value
+
+    return Metadata(full_config, dict(env) if env is not None else get_run_env())
+
+
+def load_metadata(run_dir: Path) -> Optional[Metadata]:
+    try:
+        return Metadata.from_json((run_dir / META_FILENAME).read_text())
+    except FileNotFoundError:
+        return None
+
+
+class ExperimentPlan(NamedTuple):
+    name: str
+    metadata: Metadata
+    existing_metadata: Optional[Metadata]
+
+    @property
+    def exists(self) -> bool:
+        return self.existing_metadata is not None
+
+    @property
+    def conflicts(self) -> bool:
+        return self.exists and self.existing_metadata != self.metadata
+
+
+def plan_experiment(
+    config: Dict[str, Any],
+    releval_dir: Path = Path(__file__).parent,
+    name: Optional[str] = None,
+    env: Optional[Dict[str, str]] = None,
+) -> ExperimentPlan:
+    # computes the experiment name and metadata without running anything, for
+    # planning sweeps from Python without spawning run.py --dry-run per config
+    metadata = make_metadata(config, env)
+
+    if name is None:
+        name = metadata.get_experiment_name()
+
+    return ExperimentPlan(name, metadata, load_metadata(releval_dir / "run" / name))
+
+
 def run_experiment(
     exp_name: str,
     benchmarks: List[str],
@@ -411,16 +847,25 @@ def run_experiment(
     spec_ver: Literal["2017"] | Literal["2006"] = "2017",
     dry_run: bool = False,
     overwrite: bool = False,
+    workloads: Optional[List[Workload]] = None,
+    core_plans: Sequence["CoreAllocPlan"] = (),
+    log_policy: Optional["LogPolicy"] = None,
+    admission_policy: Optional["AdmissionPolicy"] = None,
+    cgroup: Optional[Path] = None,
 ):
+    from admission import AdmissionPolicy, format_bytes
+    from hostprofile import HOST_PROFILE_FILENAME, detect_host_profile
+
+    if admission_policy is None:
+        admission_policy = AdmissionPolicy()
+
     print(f"Experiment name: {exp_name}\n\n{metadata.display()}")
 
     run_dir = releval_dir / "run" / exp_name
 
-    try:
-        metadata_ref: Metadata = Metadata.from_json(  # type: ignore
-            open(run_dir / META_FILENAME).read()
-        )
+    metadata_ref = load_metadata(run_dir)
 
+    if metadata_ref is not None:
         if overwrite:
             print(f"Previous metadata:\n{metadata_ref.display()}")
             if metadata != metadata_ref:
@@ -428,27 +873,119 @@ def run_experiment(
         else:
             raise RuntimeError("Experiment already exists")
 
-    except FileNotFoundError:
-        if not dry_run:
-            run_dir.mkdir(parents=True, exist_ok=True)
-            open(run_dir / META_FILENAME, "x").write(metadata.to_json())  # type: ignore
+    elif not dry_run:
+        run_dir.mkdir(parents=True, exist_ok=True)
+        write_file_atomic(run_dir / META_FILENAME, metadata.to_json(), exclusive=True)
 
     spec_args, spec_env = metadata.get_spec_cmd_and_env()
 
+    if core_plans:
+        # concurrent benchmarks replace these with their own plans, see
+        # run_spec_concurrently
+        spec_env.update(core_plans[0].to_env())
+
+        if not dry_run:
+            write_file_atomic(
+                run_dir / CORE_PLAN_FILENAME,
+                json.dumps(
+                    (
+                        core_plans[0]._asdict()
+                        if len(core_plans) == 1
+                        else [p._asdict() for p in core_plans]
+                    ),
+                    indent=2,
+                ),
+            )
+    elif not dry_run:
+        (run_dir / CORE_PLAN_FILENAME).unlink(missing_ok=True)
+
+    if cgroup is not None:
+        spec_env["RELEVAL_CGROUP"] = str(cgroup)
+
+    # probed once here, so that sub-runs only source the profile instead of
+    # running lscpu every time they are submitted
+    host_profile_path = run_dir.absolute() / HOST_PROFILE_FILENAME
+    spec_env["RELEVAL_HOST_PROFILE"] = str(host_profile_path)
+
+    if not dry_run:
+        host_profile = detect_host_profile().to_shell()
+
+        if host_profile_path.exists():
+            if host_profile_path.read_text() != host_profile:
+                raise RuntimeError(f"Host profile mismatch: {host_profile_path}")
+        else:
+            write_file_atomic(host_profile_path, host_profile)
+
+    if core_plans and admission_policy.max_jobs > len(core_plans):
+        admission_policy = admission_policy._replace(max_jobs=len(core_plans))
+
+    footprints: Dict[str, Optional[int]] = {}
+    if workloads is None and admission_policy.max_jobs > 1:
+        footprints = {b: None for b in benchmarks}
+        if spec_ver == "2006":
+            footprints = predict_footprints(
+                select_spec_benchmarks(benchmarks, import_collect_stats().BENCHMARKS),
+                metadata,
+                releval_dir,
+            )
+
     if dry_run:
         print(
             f"\nDry run result:\n\nSPEC args:\n{pformat(spec_args)}\n\nSPEC env:\n{pformat(spec_env)}"
         )
+        if workloads is not None:
+            print(f"\nWorkloads:\n{pformat(workloads)}")
+        if footprints and len(core_plans) > 1:
+            print(
+                f"\nCPU sets of concurrent benchmarks:\n{pformat([p.to_env() for p in core_plans])}"
+            )
+        if footprints:
+            print("\nPredicted memory footprints:")
+            for name, footprint in footprints.items():
+                print(f"- {name}: {format_bytes(footprint)}")
         return
 
-    result = run_spec(
-        benchmarks,
-        spec_args,
-        spec_env,
-        exp_name,
-        spec_dir,
-        spec_ver,
-    )
+    from logstore import LogPolicy, apply_retention, compress_file, store_run_logs
+
+    if log_policy is None:
+        log_policy = LogPolicy()
+
+    write_manifest(run_dir, MANIFEST_STATE_RUNNING)
+
+    spec_start_us = time.time_ns() // 1000
+
+    if workloads is not None:
+        write_workload_list(run_dir, workloads)
+        result = run_workloads(
+            workloads,
+            spec_args,
+            spec_env,
+            exp_name,
+            spec_dir,
+            releval_dir,
+        )
+    elif footprints:
+        result = run_spec_concurrently(
+            footprints,
+            spec_args,
+            spec_env,
+            exp_name,
+            spec_dir,
+            spec_ver,
+            admission_policy,
+            core_plans,
+        )
+    else:
+        result = run_spec(
+            benchmarks,
+            spec_args,
+            spec_env,
+            exp_name,
+            spec_dir,
+            spec_ver,
+        )
+
+    spec_end_us = time.time_ns() // 1000
 
     run_result_dir = run_dir / "result"
     run_result_dir.mkdir(parents=True, exist_ok=True)
@@ -457,8 +994,33 @@ def run_experiment(
         (run_result_dir / p.name).symlink_to(p)
 
     run_log_dir = run_dir / "log"
-    (run_log_dir / "spec_stdout.log").write_text(result.stdout)
-    (run_log_dir / "spec_stderr.log").write_text(result.stderr)
+    run_log_dir.mkdir(parents=True, exist_ok=True)
+    write_file_atomic(run_log_dir / "spec_stdout.log", result.stdout)
+    write_file_atomic(run_log_dir / "spec_stderr.log", result.stderr)
+
+    if log_policy.compress:
+        compress_file(run_log_dir / "spec_stdout.log")
+        compress_file(run_log_dir / "spec_stderr.log")
+
+    # pruned first, so that only the logs that are kept get compressed
+    apply_retention(run_dir, log_policy.retention)
+    store_run_logs(run_dir, log_policy)
+
+    # sub-runs record their own phases, see write_harness_timings in spec_submit.sh.
+    # Every run into the same experiment directory, e.g. with --overwrite or
+    # from fanout.py jobs, appends its own phases
+    with open(run_dir / HARNESS_FILENAME, "a") as f:
+        f.write(
+            f"harness.spec_start_us={spec_start_us}\n"
+            f"harness.spec_end_us={spec_end_us}\n"
+            f"harness.experiment_end_us={time.time_ns() // 1000}\n"
+        )
+
+    if result.failures:
+        write_manifest(run_dir, MANIFEST_STATE_FAILED)
+        raise RuntimeError(f"Workloads failed: {', '.join(result.failures)}")
+
+    write_manifest(run_dir, MANIFEST_STATE_COMPLETE)
 
     print(f"SPEC result written to: {result.result_paths}")
 
@@ -473,13 +1035,28 @@ def run_experiment_repeated(
     dry_run: bool = False,
     overwrite: bool = False,
     repeat: int = 1,
+    workloads: Optional[List[Workload]] = None,
+    core_plans: Sequence["CoreAllocPlan"] = (),
+    log_policy: Optional["LogPolicy"] = None,
+    admission_policy: Optional["AdmissionPolicy"] = None,
+    cgroup: Optional[Path] = None,
 ):
+    workload_repeats = []
+    if workloads is not None:
+        workload_repeats = [w.repeat or repeat for w in workloads]
+        repeat = max(workload_repeats)
+
     for i in range(repeat):
         if repeat != 1:
             name = f"{exp_name}_{i}"
         else:
             name = exp_name
 
+        if workloads is not None:
+            workloads_i = [w for w, r in zip(workloads, workload_repeats) if i < r]
+        else:
+            workloads_i = None
+
         run_experiment(
             name,
             benchmarks,
@@ -489,26 +1066,223 @@ def run_experiment_repeated(
             spec_ver,
             dry_run,
             overwrite,
+            workloads_i,
+            core_plans,
+            log_policy,
+            admission_policy,
+            cgroup,
         )
 
 
+def import_collect_stats():
+    tools_dir = Path(__file__).resolve().parent.parent.parent / "tools"
+    if str(tools_dir) not in sys.path:
+        sys.path.insert(0, str(tools_dir))
+
+    import collect_stats
+
+    return collect_stats
+
+
+def select_spec_benchmarks(
+    benchmarks: List[str], all_benchmarks: List[Any]
+) -> List[Any]:
+    selected = []
+
+    for b in all_benchmarks:
+        _, short_name = b.name.split(".", 1)
+        if any(x in ("all", b.int_or_fp, b.name, short_name) for x in benchmarks):
+            selected.append(b)
+
+    return selected
+
+
+def predict_footprints(
+    benchmarks: List[Any], metadata: Metadata, releval_dir: Path
+) -> Dict[str, Optional[int]]:
+    # peak memory of earlier experiments, preferring those with the same config,
+    # then those with the same mode, as only some modes sample memory, and then
+    # any Parallaft mode for Parallaft modes. Base runs don't have checkpoints,
+    # so their footprints say nothing about Parallaft's and vice versa
+    from admission import FOOTPRINT_MARGIN
+
+    collect_stats = import_collect_stats()
+    mode = metadata.config[OPT_MODE.name]
+
+    history: List[List[Path]] = [[], [], []]
+    for run_dir in sorted((releval_dir / "run").glob("*")):
+        ref = load_metadata(run_dir)
+        if ref is None:
+            continue
+        if ref.config == metadata.config:
+            history[0].append(run_dir)
+        elif ref.config[OPT_MODE.name] == mode:
+            history[1].append(run_dir)
+        elif mode != "base" and ref.config[OPT_MODE.name] != "base":
+            history[2].append(run_dir)
+
+    footprints: Dict[str, Optional[int]] = {}
+
+    for b in benchmarks:
+        footprints[b.name] = None
+
+        for run_dirs in history:
+            peaks = []
+            for run_dir in run_dirs:
+                stats = collect_stats.load_benchmark_stats(str(run_dir), b)
+                peaks.append(
+                    max(
+                        stats.get(collect_stats.f_pss_peak.name, 0),
+                        stats.get(
+                            collect_stats.f_checkpoint_private_dirty_peak.name, 0
+                        ),
+                    )
+                )
+
+            if max(peaks, default=0) > 0:
+                footprints[b.name] = int(max(peaks) * FOOTPRINT_MARGIN)
+                break
+
+    return footprints
+
+
+def run_experiment_adaptive(
+    exp_name: str,
+    benchmarks: List[str],
+    metadata: Metadata,
+    releval_dir: Path,
+    spec_dir: Path,
+    spec_ver: Literal["2017"] | Literal["2006"] = "2017",
+    dry_run: bool = False,
+    overwrite: bool = False,
+    min_repeat: int = 3,
+    max_repeat: int = 10,
+    base_exp_name: str = "base",
+    ci_target: float = 0.01,
+    ci_level: float = 0.95,
+    core_plans: Sequence["CoreAllocPlan"] = (),
+    log_policy: Optional["LogPolicy"] = None,
+    admission_policy: Optional["AdmissionPolicy"] = None,
+    cgroup: Optional[Path] = None,
+):
+    collect_stats = import_collect_stats()
+
+    def wall_time(stats: Dict[str, Any]) -> Optional[float]:
+        return stats.get(
+            collect_stats.f_all_wall_time.name,
+            stats.get(collect_stats.f_main_wall_time.name),
+        )
+
+    def get_exp_dirs(name: str) -> List[Path]:
+        run_dir = releval_dir / "run"
+        return [run_dir / name] + sorted(run_dir.glob(f"{name}_[0-9]*"))
+
+    base_dirs = [d for d in get_exp_dirs(base_exp_name) if d.exists()]
+    if not base_dirs and not dry_run:
+        raise RuntimeError(f"Base experiment {base_exp_name} not found")
+
+    active = select_spec_benchmarks(benchmarks, collect_stats.BENCHMARKS)
+    if not active:
+        raise ValueError(f"No known SPEC benchmark matches {benchmarks}")
+
+    base_samples = {}
+    for b in active:
+        samples = [
+            wall_time(collect_stats.load_benchmark_stats(str(d), b)) for d in base_dirs
+        ]
+        samples = [x for x in samples if x is not None]
+        if samples:
+            base_samples[b.name] = samples
+        if len(samples) == 1:
+            print(
+                f"Warning: only one {base_exp_name} run of {b.name}, its variance is not included in the confidence interval"
+            )
+
+    exp_dirs = [releval_dir / "run" / f"{exp_name}_{i}" for i in range(max_repeat)]
+    intervals: Dict[str, Tuple[float, float, int]] = {}
+
+    for i in range(max_repeat):
+        print(
+            f"\nRepeat {i + 1}/{max_repeat}, running: {' '.join(b.name for b in active)}\n"
+        )
+
+        run_experiment(
+            exp_dirs[i].name,
+            [b.name for b in active],
+            metadata,
+            releval_dir,
+            spec_dir,
+            spec_ver,
+            dry_run,
+            overwrite,
+            core_plans=core_plans,
+            log_policy=log_policy,
+            admission_policy=admission_policy,
+            cgroup=cgroup,
+        )
+
+        if dry_run:
+            return
+
+        if i + 1 < min_repeat:
+            continue
+
+        still_active = []
+        for b in active:
+            base = base_samples.get(b.name)
+            samples = [
+                wall_time(collect_stats.load_benchmark_stats(str(d), b))
+                for d in exp_dirs[: i + 1]
+            ]
+            samples = [x for x in samples if x is not None]
+
+            if base is None or len(samples) == 0:
+                print(f"Warning: no results for {b.name}, not repeating it further")
+                continue
+
+            mean, half_width = collect_stats.overhead_confidence_interval(
+                samples, base, ci_level
+            )
+            intervals[b.name] = (mean, half_width, len(samples))
+
+            if half_width > ci_target:
+                still_active.append(b)
+
+        active = still_active
+        if not active:
+            break
+
+    print(f"\nOverhead {ci_level:.0%} confidence intervals:")
+    for name, (mean, half_width, n) in intervals.items():
+        done = "" if half_width <= ci_target else " (target not reached)"
+        print(f"- {name}: {mean:.4f} +/- {half_width:.4f} over {n} runs{done}")
+
+
 def main():
+    # the other harness modules are only imported once they are needed, so that
+    # --dry-run and --print-plan stay cheap
+    from admission import AdmissionPolicy
+
     argparser = argparse.ArgumentParser()
 
     for option in EXPERIMENT_OPTION_LIST:
+        flags = [f"--{option.name}"] + EXPERIMENT_OPTION_ALIASES.get(option.name, [])
+
         if option.type == bool:
+            # --no-<option name> turns off options that default to on
             argparser.add_argument(
-                f"--{option.name}", default=option.default, action="store_true"
+                *flags, default=option.default, action=argparse.BooleanOptionalAction
             )
         else:
             argparser.add_argument(
-                f"--{option.name}",
+                *flags,
                 type=option.type,
                 default=option.default,
                 choices=option.choices,
             )
 
-    argparser.add_argument("benchmarks", nargs="+")
+    argparser.add_argument("benchmarks", nargs="*")
+    argparser.add_argument("--manifest", type=Path)
     argparser.add_argument("--name", type=str)
     argparser.add_argument(
         "--spec-dir", type=Path, default=Path(__file__).parent.parent
@@ -520,50 +1294,274 @@ def main():
     argparser.add_argument(
         "--spec-ver", choices=["auto", "2017", "2006"], default="auto"
     )
+    argparser.add_argument("--isolate", action="store_true")
+    argparser.add_argument("--adaptive-repeat", action="store_true")
+    argparser.add_argument("--min-repeat", type=int, default=3)
+    argparser.add_argument(
+        "--ci-base",
+        type=str,
+        help="defaults to the base experiment of the same options",
+    )
+    argparser.add_argument("--ci-target", type=float, default=0.01)
+    argparser.add_argument("--ci-level", type=float, default=0.95)
+    argparser.add_argument("--cpufreq-governor", type=str, default="performance")
+    argparser.add_argument("--no-log-compression", action="store_true")
+    argparser.add_argument(
+        "--log-retention", default="all", help="all, failed or none, see logstore.py"
+    )
+    argparser.add_argument("--print-run-env", action="store_true")
+    argparser.add_argument("--print-plan", action="store_true")
+    argparser.add_argument(
+        "--ablation",
+        nargs="*",
+        choices=ABLATION_VARIANTS,
+        help="run base, parallaft and the given variants (all if none is given) with the same options",
+    )
+    argparser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="run up to this many SPEC benchmarks at once while their predicted memory fits",
+    )
+    argparser.add_argument(
+        "--memory-budget",
+        type=float,
+        help="GiB for concurrent benchmarks, defaults to the available memory",
+    )
+    argparser.add_argument("--memory-reserve", type=float, default=2.0, help="GiB")
+    argparser.add_argument(
+        "--max-memory-pressure",
+        type=float,
+        default=AdmissionPolicy().max_memory_pressure,
+        help="PSI some avg10 percentage above which no benchmark is started",
+    )
     args = argparser.parse_args()
 
+    if args.print_run_env:
+        print(json.dumps(get_run_env()))
+        return
+
+    config = {
+        option.name: getattr(args, option.name) for option in EXPERIMENT_OPTION_LIST
+    }
+
+    if args.print_plan:
+        plan = plan_experiment(config, args.releval_dir, args.name)
+        print(
+            json.dumps(
+                {
+                    "name": plan.name,
+                    "metadata": asdict(plan.metadata),
+                    "exists": plan.exists,
+                    "conflicts": plan.conflicts,
+                }
+            )
+        )
+        return
+
+    if (len(args.benchmarks) == 0) == (args.manifest is None):
+        argparser.error("Specify either benchmarks or --manifest, but not both")
+
+    if args.adaptive_repeat and not 2 <= args.min_repeat <= args.repeat:
+        argparser.error(
+            "--adaptive-repeat requires 2 <= --min-repeat <= --repeat, as --repeat is the maximum number of runs"
+        )
+
+    workloads = None
+    if args.manifest is not None:
+        workloads = load_manifest(args.manifest)
+
     if args.spec_ver == "auto":
         spec_ver = "2017" if (args.spec_dir / "benchspec/CPU").exists() else "2006"
         print(f"Auto-detected SPEC version: {spec_ver}")
     else:
         spec_ver = args.spec_ver
 
-    metadata = Metadata(
-        {option.name: getattr(args, option.name) for option in EXPERIMENT_OPTION_LIST},
-        get_run_env(),
+    modes = [config[OPT_MODE.name]]
+    if args.ablation is not None:
+        if args.name is not None:
+            argparser.error("--name can't be used with --ablation")
+        modes = ABLATION_REFERENCE_MODES + (args.ablation or ABLATION_VARIANTS)
+
+    if args.jobs < 1:
+        argparser.error("--jobs must be at least 1")
+
+    if args.jobs > 1 and workloads is not None:
+        argparser.error("--jobs only supports SPEC benchmarks")
+
+    # concurrent benchmarks get disjoint CPU sets, which only auto plans provide
+    if args.jobs > 1 and config[OPT_CORE_PLAN.name] != "auto":
+        argparser.error("--jobs > 1 requires --core-plan auto")
+
+    experiments: List[Tuple[str, Metadata, List["CoreAllocPlan"]]] = []
+
+    for mode in modes:
+        metadata = make_metadata({**config, OPT_MODE.name: mode})
+
+        # base runs on a single builtin CPU, unless --isolate or --jobs need
+        # planned CPUs for it
+        core_plans: List["CoreAllocPlan"] = []
+        if config[OPT_CORE_PLAN.name] == "auto" and (
+            mode != "base" or args.isolate or args.jobs > 1
+        ):
+            from topology import detect_topology, plan_concurrent_core_allocs
+
+            topology = detect_topology()
+            core_alloc = metadata.config.get(
+                OPT_PARALLAFT_CORE_ALLOC.name, OPT_PARALLAFT_CORE_ALLOC.default
+            )
+
+            # as many concurrent benchmarks as there are CPUs for, up to --jobs
+            errors: List[ValueError] = []
+            for nr_jobs in range(args.jobs, 0, -1):
+                try:
+                    core_plans = plan_concurrent_core_allocs(
+                        topology, core_alloc, nr_jobs
+                    )
+                    break
+                except ValueError as e:
+                    errors.append(e)
+
+            if not core_plans:
+                argparser.error(f"Failed to plan CPU sets for {mode}: {errors[-1]}")
+
+            if args.jobs > 1 and len(core_plans) < 2:
+                argparser.error(
+                    f"--jobs {args.jobs} requires disjoint CPU sets for each benchmark, but there are only enough CPUs for one {mode} benchmark: {errors[0]}"
+                )
+
+            if len(core_plans) < args.jobs:
+                print(
+                    f"Warning: there are only enough CPUs for {len(core_plans)} concurrent {mode} benchmarks, running up to {len(core_plans)} at once"
+                )
+
+        exp_name = args.name
+        if exp_name is None:
+            exp_name = metadata.get_experiment_name()
+
+        experiments.append((exp_name, metadata, core_plans))
+
+    if args.isolate and config[OPT_CORE_PLAN.name] != "auto":
+        argparser.error("--isolate requires --core-plan auto")
+
+    if args.adaptive_repeat and workloads is not None:
+        argparser.error("--adaptive-repeat only supports SPEC benchmarks")
+
+    log_policy = None
+    if not args.dry_run:
+        from logstore import RETENTION_POLICIES, LogPolicy, has_zstd
+
+        if args.log_retention not in RETENTION_POLICIES:
+            argparser.error(
+                f"--log-retention must be one of {', '.join(RETENTION_POLICIES)}"
+            )
+
+        # core dumps are deduplicated whenever the retention policy keeps them,
+        # regardless of --no-log-compression, as the store is much smaller
+        zstd = has_zstd()
+        if not zstd:
+            print(
+                "Warning: zstandard is not installed, logs will not be compressed and core dumps will not be deduplicated"
+            )
+
+        log_policy = LogPolicy(
+            not args.no_log_compression and zstd, args.log_retention, zstd
+        )
+
+    admission_policy = AdmissionPolicy(
+        args.jobs,
+        int(args.memory_budget * (1 << 30)) if args.memory_budget is not None else None,
+        int(args.memory_reserve * (1 << 30)),
+        args.max_memory_pressure,
     )
 
-    exp_name = args.name
-    if exp_name is None:
-        exp_name = metadata.get_experiment_name()
+    def run():
+        for exp_name, metadata, core_plans in experiments:
+            with ExitStack() as stack:
+                cgroup = None
+                if args.isolate and not args.dry_run:
+                    from isolation import isolated_cpus
+
+                    cgroup = stack.enter_context(
+                        isolated_cpus(
+                            sorted({c for p in core_plans for c in p.all_cpus()}),
+                            governor=args.cpufreq_governor,
+                        )
+                    )
+
+                # no_turbo is only touched when asked for, and restored after
+                if (
+                    has_intel_turbo
+                    and metadata.config[OPT_INTEL_NOTURBO.name]
+                    and not args.dry_run
+                ):
+                    from isolation import intel_noturbo
+
+                    stack.enter_context(intel_noturbo())
+
+                # the base experiment is what the others are compared against,
+                # e.g. with --ablation, so it is run --min-repeat times instead
+                if args.adaptive_repeat and metadata.config[OPT_MODE.name] != "base":
+                    run_experiment_adaptive(
+                        exp_name,
+                        args.benchmarks,
+                        metadata,
+                        args.releval_dir,
+                        args.spec_dir,
+                        spec_ver,
+                        args.dry_run,
+                        args.overwrite,
+                        args.min_repeat,
+                        args.repeat,
+                        args.ci_base
+                        or make_metadata(
+                            {**metadata.config, OPT_MODE.name: "base"}, metadata.env
+                        ).get_experiment_name(),
+                        args.ci_target,
+                        args.ci_level,
+                        core_plans,
+                        log_policy,
+                        admission_policy,
+                        cgroup,
+                    )
+                else:
+                    run_experiment_repeated(
+                        exp_name,
+                        args.benchmarks,
+                        metadata,
+                        args.releval_dir,
+                        args.spec_dir,
+                        spec_ver,
+                        args.dry_run,
+                        args.overwrite,
+                        args.min_repeat if args.adaptive_repeat else args.repeat,
+                        workloads,
+                        core_plans,
+                        log_policy,
+                        admission_policy,
+                        cgroup,
+                    )
+
+        if args.ablation is not None:
+            # experiment types of collect_stats.py are named after the modes
+            plot_args = [
+                f"--{metadata.config[OPT_MODE.name]} {args.releval_dir.absolute() / 'run' / exp_name}"
+                for exp_name, metadata, _ in experiments
+            ]
+            print(
+                "\nTo analyze the ablation, run:\n"
+                f"tools/plot_stats.py ablation_overhead ablation_waterfall {' '.join(plot_args)}"
+            )
+
+    from filelock import FileLock, Timeout
 
     try:
         with FileLock(args.releval_dir / LOCK_FILENAME, timeout=0):
-            run_experiment_repeated(
-                exp_name,
-                args.benchmarks,
-                metadata,
-                args.releval_dir,
-                args.spec_dir,
-                spec_ver,
-                args.dry_run,
-                args.overwrite,
-                args.repeat,
-            )
+            run()
     except Timeout:
         print("Another experiment is running, waiting for it to finish...")
         with FileLock(args.releval_dir / LOCK_FILENAME):
-            run_experiment_repeated(
-                exp_name,
-                args.benchmarks,
-                metadata,
-                args.releval_dir,
-                args.spec_dir,
-                spec_ver,
-                args.dry_run,
-                args.overwrite,
-                args.repeat,
-            )
+            run()
 
 
 if __name__ == "__main__":
@@ -6,11 +6,18 @@
 # * RELEVAL_PARALLAFT_NO_LOG
 # * RELEVAL_PARALLAFT_CHECKPOINT_PERIOD
 # * RELEVAL_PARALLAFT_COUNT_CACHE_TLB_EVENTS
-# * RELEVAL_INTEL_NOTURBO
+# * RELEVAL_{MAIN,CHECKER,CHECKER_EMERG,CHECKER_BOOSTER,SHELL}_CPU_SET
+# * RELEVAL_MAX_NR_LIVE_SEGMENTS
+# * RELEVAL_HOST_PROFILE
+# * RELEVAL_CGROUP: cgroup to run the measured command in, see isolation.py
+# * RELEVAL_RUN_{NAME,HASH}: override the result names derived from the command
 # * [todo] RELEVAL_INTEL_L3CA
 
 set -e
 
+# harness phase timestamps in microseconds, see write_harness_timings
+HARNESS_SUBMIT_START="${EPOCHREALTIME/[.,]/}"
+
 if [ -z "$SPEC" ]; then
   echo "Error: Failed to detect SPEC environment"
   exit 1
@@ -62,67 +69,68 @@ function ensure_small_cores_present() {
   fi
 }
 
-function set_intel_noturbo() {
-  if [ "$1" -ne 0 -a "$1" -ne 1 ]; then
-    echo "Error: invalid Intel noturbo value"
-    exit 1
+# Loads the host profile probed once per experiment by run.py (see
+# hostprofile.py), so that sub-runs don't probe the CPU every time they start.
+# Without one, e.g. when runspec is invoked directly, it is probed here
+function load_host_profile() {
+  if [ -n "$RELEVAL_HOST_PROFILE" -a -f "$RELEVAL_HOST_PROFILE" ]; then
+    source "$RELEVAL_HOST_PROFILE"
+  else
+    source <(python3 "$(dirname "$(readlink -f "${BASH_SOURCE[0]}")")/hostprofile.py")
   fi
 
-  local path="/sys/devices/system/cpu/intel_pstate/no_turbo"
-  local cur_value=$(cat "$path")
-  if [ "$1" -ne "$cur_value" ]; then
-    echo "$1" >"$path"
+  if [ "$HOST_PROFILE_VERSION" != "$EXPECTED_HOST_PROFILE_VERSION" ]; then
+    echo "Error: host profile version $HOST_PROFILE_VERSION is not supported"
+    exit 1
   fi
 }
 
 function parallaft_enable_hwmon() {
-  local lscpu_result="$(lscpu)"
-  local cpu_vendor=$(grep '^Vendor ID:' <<<"$lscpu_result" | awk '{print $NF}')
-
-  if [ $(uname -m) = "aarch64" -a "$cpu_vendor" = "Apple" ]; then
-    PARALLAFT_COMMON_ARGS+=(
-      --hwmon-sensor-paths "macsmc_hwmon/CPU P-cores Power,macsmc_hwmon/CPU E-cores Power,macsmc_hwmon/SoC Power,macsmc_hwmon/DRAM VDD2H Power,macsmc_hwmon/CPU SRAM 1 Power,macsmc_hwmon/CPU SRAM 2 Power"
-    )
+  if [ -n "$HOST_HWMON_SENSOR_PATHS" ]; then
+    PARALLAFT_COMMON_ARGS+=(--hwmon-sensor-paths "$HOST_HWMON_SENSOR_PATHS")
   fi
 }
 
+# Hand-picked core sets of the machines we evaluated on, used with
+# `--core-plan builtin`
 function get_core_config() {
-  if [ $(uname -m) = "x86_64" ]; then
-    local lscpu_result="$(lscpu)"
-    local cpu_vendor=$(grep '^Vendor ID:' <<<"$lscpu_result" | awk '{print $NF}')
-    local cpu_family=$(grep '^\s*CPU family:' <<<"$lscpu_result" | awk '{print $NF}')
-    local cpu_model=$(grep '^\s*Model:' <<<"$lscpu_result" | awk '{print $NF}')
-
+  if [ "$HOST_ARCH" = "x86_64" ]; then
     BIG_CORES_SET_1="2"
     BIG_CORES_SET_2="4,6,8,10"
+    BIG_CORES_SET_ALL=""
     SMALL_CORES=""
+    MAX_NR_LIVE_SEGMENTS=5
 
-    if [ "$cpu_vendor" = "GenuineIntel" -a "$cpu_family" = "6" -a "$cpu_model" = "151" ]; then
+    if [ "$HOST_CPU_VENDOR" = "GenuineIntel" -a "$HOST_CPU_FAMILY" = "6" -a "$HOST_CPU_MODEL" = "151" ]; then
       # On our Intel i7-12700 machine, CPU 16-19 are small cores
       SMALL_CORES="16,17,18,19"
-      PARALLAFT_COMMON_ARGS+=(--max-nr-live-segments 5)
-    elif [ "$cpu_vendor" = "GenuineIntel" -a "$cpu_family" = "6" -a "$cpu_model" = "183" ]; then
+    elif [ "$HOST_CPU_VENDOR" = "GenuineIntel" -a "$HOST_CPU_FAMILY" = "6" -a "$HOST_CPU_MODEL" = "183" ]; then
       # On our Intel i7-14700 machine, CPU 16-27 are small cores
       SMALL_CORES="16,17,18,19,20,21,22,23,24,25,26,27"
-      PARALLAFT_COMMON_ARGS+=(--max-nr-live-segments 13)
-    else
-      PARALLAFT_COMMON_ARGS+=(--max-nr-live-segments 5)
+      MAX_NR_LIVE_SEGMENTS=13
     fi
   else
     BIG_CORES_SET_1="4"
     BIG_CORES_SET_2="5"
     BIG_CORES_SET_ALL="4,5,6,7"
     SMALL_CORES="0,1,2,3"
-    PARALLAFT_COMMON_ARGS+=(--max-nr-live-segments 7)
+    MAX_NR_LIVE_SEGMENTS=7
   fi
-}
 
-function parallaft_set_cpu_sets() {
-  local cpu_vendor=$(lscpu | grep '^Vendor ID:' | awk '{print $NF}')
+  # CPU sets planned by run.py from the detected core topology take precedence
+  if [ -n "$RELEVAL_MAIN_CPU_SET" ]; then
+    BIG_CORES_SET_1="$RELEVAL_MAIN_CPU_SET"
+  fi
 
-  local core_alloc="${RELEVAL_PARALLAFT_CORE_ALLOC:-all_big}"
+  if [ -n "$RELEVAL_MAX_NR_LIVE_SEGMENTS" ]; then
+    MAX_NR_LIVE_SEGMENTS="$RELEVAL_MAX_NR_LIVE_SEGMENTS"
+  fi
 
-  case "$core_alloc" in
+  PARALLAFT_COMMON_ARGS+=(--max-nr-live-segments "$MAX_NR_LIVE_SEGMENTS")
+}
+
+function parallaft_set_builtin_cpu_sets() {
+  case "$1" in
   all-big)
     MAIN_CPU_SET="$BIG_CORES_SET_1"
     CHECKER_CPU_SET="$BIG_CORES_SET_2"
@@ -141,10 +149,6 @@ function parallaft_set_cpu_sets() {
     CHECKER_EMERG_CPU_SET="$BIG_CORES_SET_2"
     CHECKER_BOOSTER_CPU_SET="$BIG_CORES_SET_ALL"
     SHELL_CPU_SET="$SMALL_CORES"
-
-    if [ "$cpu_vendor" = "GenuineIntel" ]; then
-      PARALLAFT_COMMON_ARGS+=(--enable-intel-hybrid-workaround true)
-    fi
     ;;
   inverted-heterogeneous)
     # swap the role of big and small cores
@@ -152,16 +156,34 @@ function parallaft_set_cpu_sets() {
     MAIN_CPU_SET="$SMALL_CORES"
     CHECKER_CPU_SET="$BIG_CORES_SET_2"
     SHELL_CPU_SET="$BIG_CORES_SET_2"
-
-    if [ "$cpu_vendor" = "GenuineIntel" ]; then
-      PARALLAFT_COMMON_ARGS+=(--enable-intel-hybrid-workaround true)
-    fi
     ;;
   *)
     echo "Error: unsupported \$RELEVAL_PARALLAFT_CORE_ALLOC"
     exit 1
     ;;
   esac
+}
+
+function parallaft_set_cpu_sets() {
+  local core_alloc="${RELEVAL_PARALLAFT_CORE_ALLOC:-all_big}"
+
+  if [ -n "$RELEVAL_MAIN_CPU_SET" ]; then
+    MAIN_CPU_SET="$RELEVAL_MAIN_CPU_SET"
+    CHECKER_CPU_SET="$RELEVAL_CHECKER_CPU_SET"
+    CHECKER_EMERG_CPU_SET="$RELEVAL_CHECKER_EMERG_CPU_SET"
+    CHECKER_BOOSTER_CPU_SET="$RELEVAL_CHECKER_BOOSTER_CPU_SET"
+    SHELL_CPU_SET="$RELEVAL_SHELL_CPU_SET"
+  else
+    parallaft_set_builtin_cpu_sets "$core_alloc"
+  fi
+
+  if [ "$HOST_CPU_VENDOR" = "GenuineIntel" ]; then
+    case "$core_alloc" in
+    heterogeneous | inverted-heterogeneous)
+      PARALLAFT_COMMON_ARGS+=(--enable-intel-hybrid-workaround true)
+      ;;
+    esac
+  fi
 
   PARALLAFT_COMMON_ARGS+=(
     --main-cpu-set "$MAIN_CPU_SET"
@@ -184,13 +206,13 @@ function parallaft_set_checkpoint_period() {
 }
 
 function parallaft_enable_perf_counters() {
-  if [ $(uname -m) != "x86_64" ]; then
+  if [ -z "$HOST_PERF_COUNTERS" ]; then
     return
   fi
 
-  local perf_counters="instructions,cycles,energy-cores,energy-pkg"
+  local perf_counters="$HOST_PERF_COUNTERS"
   if [ -n "$RELEVAL_PARALLAFT_COUNT_CACHE_TLB_EVENTS" -a "$RELEVAL_PARALLAFT_COUNT_CACHE_TLB_EVENTS" = "1" ]; then
-    perf_counters="$perf_counters,ll-loads,ll-load-misses,ll-stores,ll-store-misses,dtlb-loads,dtlb-load-misses,dtlb-stores,dtlb-store-misses"
+    perf_counters="$perf_counters,$HOST_CACHE_TLB_PERF_COUNTERS"
   fi
 
   PARALLAFT_COMMON_ARGS+=(
@@ -207,6 +229,49 @@ function parallaft_enable_core_dump() {
   )
 }
 
+# Records how long the harness itself spent on setting up the sub-run, running
+# the benchmark (including wrappers such as /bin/time) and tearing it down,
+# using bash's built-in clock to avoid forking
+function write_harness_timings() {
+  local submit_end="${EPOCHREALTIME/[.,]/}"
+
+  printf '%s\n' \
+    "harness.submit_start_us=$HARNESS_SUBMIT_START" \
+    "harness.submit_end_us=$submit_end" \
+    "harness.setup_us=$((HARNESS_RUN_START - HARNESS_SUBMIT_START))" \
+    "harness.run_us=$((HARNESS_RUN_END - HARNESS_RUN_START))" \
+    "harness.teardown_us=$((submit_end - HARNESS_RUN_END))" \
+    >"$RESULT_PREFIX.harness.txt.tmp"
+  mv -f "$RESULT_PREFIX.harness.txt.tmp" "$RESULT_PREFIX.harness.txt"
+}
+
+# Runs the given command, which writes its stats to $STATS_TMP, then publishes
+# the stats by atomically renaming them into the result directory, so that an
+# interrupted run never leaves a partially-written stats file behind. A failed
+# run is marked with its exit status, which collect_stats.py reports, unless
+# its stats are truncated, which collect_stats.py rejects anyway
+function run_and_publish_stats() {
+  local status=0
+
+  HARNESS_RUN_START="${EPOCHREALTIME/[.,]/}"
+  "$@" || status=$?
+  HARNESS_RUN_END="${EPOCHREALTIME/[.,]/}"
+
+  if [ $status -ne 0 ] && [ -z "$(tail -c 1 "$STATS_TMP" 2>/dev/null)" ]; then
+    echo "timing.exit_status=$status" >>"$STATS_TMP"
+  fi
+
+  if [ -f "$STATS_TMP" ]; then
+    mv -f "$STATS_TMP" "$RESULT_PREFIX.stats.txt"
+  fi
+
+  write_harness_timings || echo "Warning: failed to write harness timings of $RUN_ID"
+
+  exit $status
+}
+
+EXPECTED_HOST_PROFILE_VERSION=2
+
 EXP_DIR="$SPEC/releval/run/$RELEVAL_EXP_NAME"
 LOG_DIR="$EXP_DIR/log"
 RESULT_DIR="$EXP_DIR/result"
@@ -224,21 +289,26 @@ if [[ -n "$STDIN_FILE" && "$STDIN_FILE" != /dev/* ]]; then
   RUN_ID="$RUN_ID < $STDIN_FILE"
 fi
 
-RUN_HASH=`echo -n "$RUN_ID" | md5sum | head -c 6`
-LOG_PREFIX="$LOG_DIR/$RUN_HASH-$(basename $1)"
-RESULT_PREFIX="$RESULT_DIR/$RUN_HASH-$(basename $1)"
+RUN_HASH="${RELEVAL_RUN_HASH:-`echo -n "$RUN_ID" | md5sum | head -c 6`}"
+RUN_NAME="${RELEVAL_RUN_NAME:-$(basename $1)}"
+LOG_PREFIX="$LOG_DIR/$RUN_HASH-$RUN_NAME"
+RESULT_PREFIX="$RESULT_DIR/$RUN_HASH-$RUN_NAME"
+STATS_TMP="$RESULT_PREFIX.stats.txt.tmp"
 
 echo "$RUN_ID" > "$LOG_PREFIX.run_id.txt"
 
-if [ -n "$RELEVAL_INTEL_NO_TURBO" ]; then
-  set_intel_noturbo "$RELEVAL_INTEL_NO_TURBO"
+# only the measured command is moved into the isolated CPUs, this script and
+# /bin/time stay on the housekeeping ones
+IN_CGROUP=()
+if [ -n "$RELEVAL_CGROUP" ]; then
+  IN_CGROUP=(sh -c 'echo $$ >"$0/cgroup.procs" && exec "$@"' "$RELEVAL_CGROUP")
 fi
 
 case "$ACTION" in
 strace)
-  exec time \
+  run_and_publish_stats command time \
     -f $'timing.main_user_time=0\ntiming.main_sys_time=0\ntiming.main_wall_time=%e\ntiming.exit_status=%x\n' \
-    -o "$RESULT_PREFIX.stats.txt" \
+    -o "$STATS_TMP" \
     strace -f -tt -o "$LOG_PREFIX.strace.log" -- "$@"
   ;;
 sdt)
@@ -247,18 +317,20 @@ sdt)
 run)
   env >"$LOG_PREFIX.env.txt"
 
+  load_host_profile
   get_core_config
 
-  /bin/time \
+  run_and_publish_stats /bin/time \
     -f $'timing.main_user_time=%U\ntiming.main_sys_time=%S\ntiming.main_wall_time=%e\ntiming.exit_status=%x\n' \
-    -o "$RESULT_PREFIX.stats.txt" \
-    taskset -c "$BIG_CORES_SET_1" "$@"
+    -o "$STATS_TMP" \
+    "${IN_CGROUP[@]}" taskset -c "$BIG_CORES_SET_1" "$@"
   ;;
 parallaft)
   if [ -z "$RELEVAL_PARALLAFT_NO_LOG" ]; then
     export RUST_LOG=info
   fi
 
+  load_host_profile
   get_core_config
   parallaft_set_cpu_sets
   parallaft_set_checkpoint_period
@@ -268,7 +340,7 @@ parallaft)
 
   PARALLAFT_COMMON_ARGS+=(
     --log-output "$LOG_PREFIX.log"
-    --stats-output "$RESULT_PREFIX.stats.txt"
+    --stats-output "$STATS_TMP"
   )
 
   PARALLAFT_EXEC=(
@@ -282,7 +354,7 @@ parallaft)
   echo "${PARALLAFT_EXEC[@]}" >"$LOG_PREFIX.cmd"
   env >"$LOG_PREFIX.env.txt"
 
-  exec "${PARALLAFT_EXEC[@]}"
+  run_and_publish_stats "${IN_CGROUP[@]}" "${PARALLAFT_EXEC[@]}"
   ;;
 *)
   usage
@@ -0,0 +1,274 @@
+#!/usr/bin/python3
+
+from typing import Dict, List, NamedTuple, Optional
+from collections import OrderedDict
+from pathlib import Path
+
+import argparse
+
+SYSFS_CPU_DIR = Path("/sys/devices/system/cpu")
+# relative to /sys/devices, i.e. the parent of SYSFS_CPU_DIR's parent
+INTEL_HYBRID_BIG_CPUS = Path("cpu_core/cpus")
+INTEL_HYBRID_LITTLE_CPUS = Path("cpu_atom/cpus")
+
+# CPUs whose cluster performance is within this fraction of the fastest cluster
+# are considered big, so that favoured cores (e.g. Intel Turbo Boost Max 3.0)
+# don't end up in a class of their own.
+BIG_CORE_PERF_THRESHOLD = 0.8
+
+CORE_ALLOC_MODES = ["all-big", "all-small", "heterogeneous", "inverted-heterogeneous"]
+
+
+def parse_cpu_list(s: str) -> List[int]:
+    cpus = []
+
+    for part in s.strip().split(","):
+        if "-" in part:
+            first, last = part.split("-", 1)
+            cpus += range(int(first), int(last) + 1)
+        elif part:
+            cpus.append(int(part))
+
+    return cpus
+
+
+def format_cpu_list(cpus: List[int]) -> str:
+    return ",".join(map(str, cpus))
+
+
+def read_int(path: Path) -> Optional[int]:
+    try:
+        return int(path.read_text().strip())
+    except (OSError, ValueError):
+        return None
+
+
+class CpuInfo(NamedTuple):
+    cpu: int
+    thread_siblings: List[int]
+    capacity: Optional[int]
+    max_freq: Optional[int]
+    cluster_id: Optional[int]
+    l2_id: Optional[int]
+
+    @property
+    def perf(self) -> Optional[int]:
+        return self.capacity if self.capacity is not None else self.max_freq
+
+    @property
+    def group(self) -> int:
+        if self.cluster_id is not None and self.cluster_id >= 0:
+            return self.cluster_id
+        if self.l2_id is not None:
+            return self.l2_id
+        return self.cpu
+
+
+def read_cpu_info(cpu: int, sysfs_cpu_dir: Path = SYSFS_CPU_DIR) -> CpuInfo:
+    cpu_dir = sysfs_cpu_dir / f"cpu{cpu}"
+
+    l2_id = None
+    for cache_dir in sorted((cpu_dir / "cache").glob("index*")):
+        if read_int(cache_dir / "level") == 2:
+            l2_id = read_int(cache_dir / "id")
+            break
+
+    try:
+        thread_siblings = parse_cpu_list(
+            (cpu_dir / "topology/thread_siblings_list").read_text()
+        )
+    except OSError:
+        thread_siblings = [cpu]
+
+    return CpuInfo(
+        cpu=cpu,
+        thread_siblings=thread_siblings,
+        capacity=read_int(cpu_dir / "cpu_capacity"),
+        max_freq=read_int(cpu_dir / "cpufreq/cpuinfo_max_freq"),
+        cluster_id=read_int(cpu_dir / "topology/cluster_id"),
+        l2_id=l2_id,
+    )
+
+
+class CoreTopology(NamedTuple):
+    big_cores: List[int]
+    little_cores: List[int]
+
+
+def classify_cores(
+    cpus: List[CpuInfo], sysfs_cpu_dir: Path = SYSFS_CPU_DIR
+) -> CoreTopology:
+    # use one logical CPU per physical core to keep SMT siblings out of the
+    # checker sets
+    cpus = [c for c in cpus if c.cpu == min(c.thread_siblings + [c.cpu])]
+
+    devices_dir = sysfs_cpu_dir.parent.parent
+    big_cpus_path = devices_dir / INTEL_HYBRID_BIG_CPUS
+    little_cpus_path = devices_dir / INTEL_HYBRID_LITTLE_CPUS
+
+    if big_cpus_path.exists() and little_cpus_path.exists():
+        big = set(parse_cpu_list(big_cpus_path.read_text()))
+        return CoreTopology(
+            big_cores=[c.cpu for c in cpus if c.cpu in big],
+            little_cores=[c.cpu for c in cpus if c.cpu not in big],
+        )
+
+    if any(c.perf is None for c in cpus):
+        return CoreTopology(big_cores=[c.cpu for c in cpus], little_cores=[])
+
+    groups: Dict[int, List[CpuInfo]] = OrderedDict()
+    for c in cpus:
+        groups.setdefault(c.group, []).append(c)
+
+    group_perf = {
+        g: sum(c.perf for c in members) / len(members)  # type: ignore
+        for g, members in groups.items()
+    }
+    max_perf = max(group_perf.values())
+
+    big_cores = []
+    little_cores = []
+    for c in cpus:
+        if group_perf[c.group] >= max_perf * BIG_CORE_PERF_THRESHOLD:
+            big_cores.append(c.cpu)
+        else:
+            little_cores.append(c.cpu)
+
+    return CoreTopology(big_cores=big_cores, little_cores=little_cores)
+
+
+def detect_topology(sysfs_cpu_dir: Path = SYSFS_CPU_DIR) -> CoreTopology:
+    online = parse_cpu_list((sysfs_cpu_dir / "online").read_text())
+    return classify_cores(
+        [read_cpu_info(cpu, sysfs_cpu_dir) for cpu in online], sysfs_cpu_dir
+    )
+
+
+class CoreAllocPlan(NamedTuple):
+    core_alloc: str
+    main_cpu_set: List[int]
+    checker_cpu_set: List[int]
+    checker_emerg_cpu_set: List[int]
+    checker_booster_cpu_set: List[int]
+    shell_cpu_set: List[int]
+    max_nr_live_segments: int
+
+    def all_cpus(self) -> List[int]:
+        return sorted(
+            set(
+                self.main_cpu_set
+                + self.checker_cpu_set
+                + self.checker_emerg_cpu_set
+                + self.checker_booster_cpu_set
+                + self.shell_cpu_set
+            )
+        )
+
+    def to_env(self) -> Dict[str, str]:
+        return {
+            "RELEVAL_MAIN_CPU_SET": format_cpu_list(self.main_cpu_set),
+            "RELEVAL_CHECKER_CPU_SET": format_cpu_list(self.checker_cpu_set),
+            "RELEVAL_CHECKER_EMERG_CPU_SET": format_cpu_list(
+                self.checker_emerg_cpu_set
+            ),
+            "RELEVAL_CHECKER_BOOSTER_CPU_SET": format_cpu_list(
+                self.checker_booster_cpu_set
+            ),
+            "RELEVAL_SHELL_CPU_SET": format_cpu_list(self.shell_cpu_set),
+            "RELEVAL_MAX_NR_LIVE_SEGMENTS": str(self.max_nr_live_segments),
+        }
+
+
+def plan_core_alloc(topology: CoreTopology, core_alloc: str) -> CoreAllocPlan:
+    big = list(topology.big_cores)
+    small = list(topology.little_cores)
+
+    # keep CPU 0, which usually takes most IRQs and housekeeping work, free
+    # when there are enough big cores to spare it
+    if len(big) >= 3 and big[0] == 0:
+        big = big[1:]
+
+    if len(big) < 2:
+        raise ValueError(f"At least two big cores are required, found {big}")
+
+    big_set_1 = big[:1]
+    big_set_2 = big[1:]
+
+    if core_alloc != "all-big" and len(small) == 0:
+        raise ValueError(
+            f"Core allocation {core_alloc} requires small cores, but none is detected"
+        )
+
+    emerg: List[int] = []
+    booster: List[int] = []
+
+    if core_alloc == "all-big":
+        main, checker, shell = big_set_1, big_set_2, big_set_2
+    elif core_alloc == "all-small":
+        main, checker, shell = small, small, small
+    elif core_alloc == "heterogeneous":
+        main, checker, shell = big_set_1, small, small
+        emerg = big_set_2
+        booster = big
+    elif core_alloc == "inverted-heterogeneous":
+        main, checker, shell = small, big_set_2, big_set_2
+    else:
+        raise ValueError(f"Unsupported core allocation {core_alloc}")
+
+    return CoreAllocPlan(
+        core_alloc=core_alloc,
+        main_cpu_set=main,
+        checker_cpu_set=checker,
+        checker_emerg_cpu_set=emerg,
+        checker_booster_cpu_set=booster,
+        shell_cpu_set=shell,
+        max_nr_live_segments=len(checker) + 1,
+    )
+
+
+def split_cores(cores: List[int], n: int) -> List[List[int]]:
+    # contiguous slices that differ in size by at most one core, so that each
+    # slice keeps to as few clusters as possible
+    return [cores[i * len(cores) // n : (i + 1) * len(cores) // n] for i in range(n)]
+
+
+def plan_concurrent_core_allocs(
+    topology: CoreTopology, core_alloc: str, nr_jobs: int
+) -> List[CoreAllocPlan]:
+    # one plan per concurrent job on disjoint slices of the big and little
+    # cores, CPU 0 is spared like in plan_core_alloc
+    big = list(topology.big_cores)
+    if len(big) > 2 * nr_jobs and big[0] == 0:
+        big = big[1:]
+
+    return [
+        plan_core_alloc(CoreTopology(big_cores, little_cores), core_alloc)
+        for big_cores, little_cores in zip(
+            split_cores(big, nr_jobs), split_cores(topology.little_cores, nr_jobs)
+        )
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sysfs-cpu-dir", type=Path, default=SYSFS_CPU_DIR)
+    args = parser.parse_args()
+
+    topology = detect_topology(args.sysfs_cpu_dir)
+    print(f"Big cores: {format_cpu_list(topology.big_cores)}")
+    print(f"Little cores: {format_cpu_list(topology.little_cores)}")
+
+    for core_alloc in CORE_ALLOC_MODES:
+        try:
+            plan = plan_core_alloc(topology, core_alloc)
+        except ValueError as e:
+            print(f"\n{core_alloc}: {e}")
+            continue
+
+        print(f"\n{core_alloc}:")
+        for k, v in plan.to_env().items():
+            print(f"- {k}={v}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+
+from typing import Any, Callable, Dict, List, NamedTuple
+from collections import OrderedDict
+from pathlib import Path
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from collect_stats import (
+    CMD_FIELD_FLAGS,
+    CROSS_EXP_DERIVED_FIELD_LIST,
+    EXPERIMENT_TYPE_LIST,
+    FIELD_LIST,
+    MANIFEST_FILENAME,
+    Benchmark,
+    ExperimentType,
+    ResultTable,
+    calculate_cross_exp_derived_fields,
+    calculate_derived_fields,
+    load_benchmark_stats,
+    make_table,
+    parse_stats_file,
+    sha256_file,
+    sum_stats_file,
+)
+
+
+class TreeSpec(NamedTuple):
+    benchmarks: int
+    sub_runs: int
+    repeats: int
+    keys: int
+    manifests: bool
+
+
+class StageResult(NamedTuple):
+    name: str
+    items: int
+    unit: str
+    times: List[float]
+    peak_memory: int
+
+    @property
+    def time(self) -> float:
+        return statistics.median(self.times)
+
+    @property
+    def throughput(self) -> float:
+        return self.items / self.time if self.time > 0 else float("inf")
+
+
+def make_benchmarks(spec: TreeSpec) -> List[Benchmark]:
+    return [
+        Benchmark(
+            "synthetic",
+            "int" if i % 2 == 0 else "fp",
+            f"{900 + i}.synth{i}",
+            f"synth{i}_base",
+            [f"{i:03x}{j:03x}" for j in range(spec.sub_runs)],
+        )
+        for i in range(spec.benchmarks)
+    ]
+
+
+def make_stats_content(spec: TreeSpec, rng: random.Random) -> str:
+    lines = []
+
+    for f in FIELD_LIST:
+        # config fields come from the .cmd files
+        if f.name.startswith("config."):
+            continue
+        if f.name == "timing.exit_status":
+            lines.append(f"{f.name}=0")
+        elif f.name.endswith("wall_time"):
+            # wall time covers the CPU time, keeping derived overheads sane
+            lines.append(f"{f.name}={rng.uniform(200, 300)}")
+        elif f.type == int:
+            lines.append(f"{f.name}={rng.randint(1, 1 << 30)}")
+        else:
+            lines.append(f"{f.name}={rng.uniform(1, 100)}")
+
+    for i in range(max(0, spec.keys - len(lines))):
+        lines.append(f"synthetic.key_{i}={rng.randint(0, 1 << 20)}")
+
+    return "\n".join(lines) + "\n"
+
+
+def make_cmd_content() -> str:
+    args = ["parallaft"]
+    for flag in CMD_FIELD_FLAGS:
+        args += [flag, "0-3" if flag.endswith("-cpu-set") else "4"]
+    return " ".join(args + ["--", "program"])
+
+
+def generate_tree(
+    root: Path, spec: TreeSpec, benchmarks: List[Benchmark], seed: int = 0
+) -> Dict[int, Dict[ExperimentType, str]]:
+    rng = random.Random(seed)
+    cmd_content = make_cmd_content()
+    experiment_dirs = {}
+
+    for repeat in range(spec.repeats):
+        experiment_dirs[repeat] = {}
+
+        for exp_type in EXPERIMENT_TYPE_LIST:
+            run_dir = root / "run" / f"{exp_type.value}_{repeat}"
+            result_dir = run_dir / "result"
+            log_dir = run_dir / "log"
+            result_dir.mkdir(parents=True, exist_ok=True)
+            log_dir.mkdir(parents=True, exist_ok=True)
+
+            files = {}
+            for b in benchmarks:
+                for sub_run_hash in b.sub_run_hashes:
+                    name = f"{sub_run_hash}-{b.filename}.releval"
+                    stats_path = result_dir / f"{name}.stats.txt"
+                    stats_path.write_text(make_stats_content(spec, rng))
+                    (log_dir / f"{name}.cmd").write_text(cmd_content)
+                    files[f"result/{stats_path.name}"] = sha256_file(str(stats_path))
+
+            if spec.manifests:
+                (run_dir / MANIFEST_FILENAME).write_text(
+                    json.dumps({"state": "complete", "files": files})
+                )
+
+            experiment_dirs[repeat][exp_type] = str(run_dir)
+
+    return experiment_dirs
+
+
+def run_stage(
+    name: str,
+    items: int,
+    unit: str,
+    fn: Callable[[], Any],
+    iterations: int,
+) -> StageResult:
+    times = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    # a separate pass, as tracing allocations slows the stage down
+    tracemalloc.start()
+    fn()
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return StageResult(name, items, unit, times, peak_memory)
+
+
+def run_benchmarks(
+    experiment_dirs: Dict[int, Dict[ExperimentType, str]],
+    benchmarks: List[Benchmark],
+    iterations: int,
+) -> List[StageResult]:
+    all_dirs = [d for dirs in experiment_dirs.values() for d in dirs.values()]
+
+    stats_files = [
+        [
+            f"{d}/result/{sub_run_hash}-{b.filename}.releval.stats.txt"
+            for sub_run_hash in b.sub_run_hashes
+        ]
+        for d in all_dirs
+        for b in benchmarks
+    ]
+    nr_files = sum(len(files) for files in stats_files)
+
+    summed_stats = [sum_stats_file(files) for files in stats_files]
+
+    def collect():
+        return [
+            ResultTable(dirs, benchmarks).all_exp_stats()
+            for dirs in experiment_dirs.values()
+        ]
+
+    collected = collect()
+    all_exp_stats = [s for repeat in collected for s in repeat]
+
+    def strip_cross_exp_derived():
+        out = []
+        for _, exp_stats in all_exp_stats:
+            exp_stats = OrderedDict(
+                (k, v)
+                for k, v in exp_stats.items()
+                if k[0] != ExperimentType.CROSS_EXP_DERIVED
+            )
+            out.append(exp_stats)
+        return out
+
+    stripped = strip_cross_exp_derived()
+
+    fields = [
+        (ExperimentType.CROSS_EXP_DERIVED, f) for f in CROSS_EXP_DERIVED_FIELD_LIST
+    ]
+
+    memoized_tables = [
+        ResultTable(dirs, benchmarks) for dirs in experiment_dirs.values()
+    ]
+    for table in memoized_tables:
+        table.all_exp_stats()
+
+    stages = [
+        (
+            "parse_stats_file",
+            nr_files,
+            "files",
+            lambda: [parse_stats_file(f) for files in stats_files for f in files],
+        ),
+        (
+            "sum_stats_file",
+            nr_files,
+            "files",
+            lambda: [sum_stats_file(files) for files in stats_files],
+        ),
+        (
+            "calculate_derived_fields",
+            len(summed_stats),
+            "benchmarks",
+            lambda: [calculate_derived_fields(OrderedDict(s)) for s in summed_stats],
+        ),
+        (
+            "load_benchmark_stats",
+            nr_files,
+            "files",
+            lambda: [load_benchmark_stats(d, b) for d in all_dirs for b in benchmarks],
+        ),
+        (
+            "calculate_cross_exp_derived_fields",
+            len(stripped),
+            "benchmarks",
+            lambda: [
+                calculate_cross_exp_derived_fields(OrderedDict(s)) for s in stripped
+            ],
+        ),
+        ("collect_exp_stats", nr_files, "files", collect),
+        (
+            "make_table_geomean",
+            len(all_exp_stats),
+            "rows",
+            lambda: make_table(all_exp_stats, fields, geomean=True),
+        ),
+        (
+            "memoized_requery",
+            len(all_exp_stats),
+            "rows",
+            lambda: [table.all_exp_stats() for table in memoized_tables],
+        ),
+    ]
+
+    return [
+        run_stage(name, items, unit, fn, iterations)
+        for name, items, unit, fn in stages
+    ]
+
+
+def format_results(results: List[StageResult]) -> str:
+    out = "{:<36} {:>8} {:<12} {:>10} {:>14} {:>11}\n".format(
+        "stage", "items", "unit", "time (ms)", "throughput/s", "peak (MiB)"
+    )
+
+    for r in results:
+        out += "{:<36} {:>8} {:<12} {:>10.2f} {:>14.0f} {:>11.2f}\n".format(
+            r.name,
+            r.items,
+            r.unit,
+            r.time * 1000,
+            r.throughput,
+            r.peak_memory / (1 << 20),
+        )
+
+    return out
+
+
+def results_to_json(spec: TreeSpec, results: List[StageResult]) -> Dict[str, Any]:
+    return {
+        "spec": spec._asdict(),
+        "stages": {
+            r.name: {
+                "items": r.items,
+                "unit": r.unit,
+                "time": r.time,
+                "times": r.times,
+                "throughput": r.throughput,
+                "peak_memory": r.peak_memory,
+            }
+            for r in results
+        },
+    }
+
+
+def find_regressions(
+    results: List[StageResult], baseline: Dict[str, Any], max_regression: float
+) -> List[str]:
+    regressions = []
+
+    for r in results:
+        ref = baseline["stages"].get(r.name)
+        if ref is None:
+            continue
+
+        # compare throughput so that baselines at a different scale still apply
+        if r.throughput < ref["throughput"] * (1 - max_regression):
+            regressions.append(
+                f"{r.name}: throughput {r.throughput:.0f} {r.unit}/s, baseline {ref['throughput']:.0f} {r.unit}/s"
+            )
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--benchmarks", type=int, default=29)
+    parser.add_argument("--sub-runs", type=int, default=3)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--keys", type=int, default=80, help="keys per stats file")
+    parser.add_argument("--no-manifests", action="store_true")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--tree-dir", type=Path, help="generate the result tree here and keep it"
+    )
+    parser.add_argument("--json", type=Path, help="write results as JSON")
+    parser.add_argument("--baseline", type=Path, help="JSON results to compare with")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+
+    spec = TreeSpec(
+        args.benchmarks, args.sub_runs, args.repeats, args.keys, not args.no_manifests
+    )
+    benchmarks = make_benchmarks(spec)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = args.tree_dir if args.tree_dir is not None else Path(tmp_dir)
+
+        start = time.perf_counter()
+        experiment_dirs = generate_tree(root, spec, benchmarks, args.seed)
+        print(
+            f"Generated {spec.benchmarks} benchmarks x {spec.sub_runs} sub-runs x {spec.repeats} repeats x {len(EXPERIMENT_TYPE_LIST)} experiments under {root} in {time.perf_counter() - start:.2f}s\n",
+            file=sys.stderr,
+        )
+
+        results = run_benchmarks(experiment_dirs, benchmarks, args.iterations)
+
+    print(format_results(results), end="")
+
+    if args.json is not None:
+        args.json.write_text(json.dumps(results_to_json(spec, results), indent=2))
+
+    if args.baseline is not None:
+        regressions = find_regressions(
+            results, json.loads(args.baseline.read_text()), args.max_regression
+        )
+        if regressions:
+            print("\nRegressions:")
+            for r in regressions:
+                print(f"- {r}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
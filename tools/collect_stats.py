@@ -7,7 +7,9 @@ from typing import (
     Dict,
     Any,
     Generic,
+    List,
     NamedTuple,
+    Optional,
     Sequence,
     Tuple,
     TypeVar,
@@ -16,7 +18,13 @@ from typing import (
 from collections import namedtuple, OrderedDict
 from copy import deepcopy
 from glob import glob
+from statistics import NormalDist
 import argparse
+import hashlib
+import io
+import json
+import math
+import os
 import sys
 import numpy as np
 
@@ -122,6 +130,7 @@ FIELD_LIST = [
     (f_dtlb_stores := Field("perf.dtlb_stores", int)),
     (f_dtlb_store_misses := Field("perf.dtlb_store_misses", int)),
     (f_instructions := Field("perf.instructions", int)),
+    (f_cycles := Field("perf.cycles", int)),
     (f_energy_pkg := Field("perf.energy_pkg", int)),
     (f_energy_cores := Field("perf.energy_cores", int)),
     (f_nr_dirty_pages := Field("dirty_pages.total_dirty_pages", int)),
@@ -192,8 +201,21 @@ FIELD_LIST = [
             lambda x: x,
         )
     ),
+    (f_main_cpu_count := Field("config.main_cpu_count", int, 0, max_reducer)),
+    (f_checker_cpu_count := Field("config.checker_cpu_count", int, 0, max_reducer)),
+    (
+        f_max_nr_live_segments := Field(
+            "config.max_nr_live_segments", int, 0, max_reducer
+        )
+    ),
 ]
 
+CMD_FIELD_FLAGS = {
+    "--main-cpu-set": f_main_cpu_count,
+    "--checker-cpu-set": f_checker_cpu_count,
+    "--max-nr-live-segments": f_max_nr_live_segments,
+}
+
 FIELD_DICT = {f.name: f for f in FIELD_LIST}
 
 DERIVED_FIELD_LIST = [
@@ -211,6 +233,58 @@ DERIVED_FIELD_LIST = [
             ]
         ),
     ),
+    f_checker_cpu_time := DerivedField(
+        "timing.checker_cpu_time",
+        lambda stats: stats[f_checker_user_time.name] + stats[f_checker_sys_time.name],
+    ),
+    f_checker_parallelism := DerivedField(
+        "checker.parallelism",
+        lambda stats: stats[f_checker_cpu_time.name] / stats[f_all_wall_time.name],
+    ),
+    f_checker_utilization := DerivedField(
+        "checker.utilization",
+        lambda stats: stats[f_checker_parallelism.name]
+        / stats[f_checker_cpu_count.name],
+    ),
+    f_checker_slack := DerivedField(
+        "checker.slack",
+        lambda stats: stats[f_checker_cpu_count.name]
+        - stats[f_checker_parallelism.name],
+    ),
+    f_checker_cpu_time_ratio := DerivedField(
+        "checker.cpu_time_ratio",
+        lambda stats: stats[f_checker_cpu_time.name] / stats[f_main_cpu_time.name],
+    ),
+    f_ipc := DerivedField(
+        "perf.ipc",
+        lambda stats: stats[f_instructions.name] / stats[f_cycles.name],
+    ),
+    f_llc_mpki := DerivedField(
+        "perf.llc_mpki",
+        lambda stats: (stats[f_llc_load_misses.name] + stats[f_llc_store_misses.name])
+        / stats[f_instructions.name]
+        * 1000,
+    ),
+    f_llc_miss_ratio := DerivedField(
+        "perf.llc_miss_ratio",
+        lambda stats: (stats[f_llc_load_misses.name] + stats[f_llc_store_misses.name])
+        / (stats[f_llc_loads.name] + stats[f_llc_stores.name]),
+    ),
+    f_dtlb_mpki := DerivedField(
+        "perf.dtlb_mpki",
+        lambda stats: (
+            stats[f_dtlb_load_misses.name] + stats[f_dtlb_store_misses.name]
+        )
+        / stats[f_instructions.name]
+        * 1000,
+    ),
+    f_dtlb_miss_ratio := DerivedField(
+        "perf.dtlb_miss_ratio",
+        lambda stats: (
+            stats[f_dtlb_load_misses.name] + stats[f_dtlb_store_misses.name]
+        )
+        / (stats[f_dtlb_loads.name] + stats[f_dtlb_stores.name]),
+    ),
 ]
 
 
@@ -219,14 +293,29 @@ class ExperimentType(Enum):
     BASE_WITH_PERF_COUNTERS = "base_perf_counters"
     PARALLAFT = "parallaft"
     RAFT = "raft"
+    PARALLAFT_NOFORK = "parallaft_nofork"
+    PARALLAFT_NOMEMCHECK = "parallaft_nomemcheck"
+    PARALLAFT_DYNSLICING = "parallaft_dynslicing"
+    PARALLAFT_DYNCPUFREQ = "parallaft_dyncpufreq"
+    PARALLAFT_DYN2 = "parallaft_dyn2"
     CROSS_EXP_DERIVED = "derived"
 
 
+# runtime-mode variants of Parallaft, named after their run.py modes
+ABLATION_VARIANT_LIST = [
+    ExperimentType.PARALLAFT_NOFORK,
+    ExperimentType.PARALLAFT_NOMEMCHECK,
+    ExperimentType.PARALLAFT_DYNSLICING,
+    ExperimentType.PARALLAFT_DYNCPUFREQ,
+    ExperimentType.PARALLAFT_DYN2,
+]
+
 EXPERIMENT_TYPE_LIST = [
     ExperimentType.BASE,
     ExperimentType.BASE_WITH_PERF_COUNTERS,
     ExperimentType.PARALLAFT,
     ExperimentType.RAFT,
+    *ABLATION_VARIANT_LIST,
 ]
 
 
@@ -302,24 +391,258 @@ CROSS_EXP_DERIVED_FIELD_LIST = [
     ),
 ]
 
+
+def make_interference_fields(
+    exp_type: ExperimentType, prefix: str
+) -> List[CrossExperimentDerivedField[float]]:
+    # changes of the main's microarchitectural behaviour when checkers share
+    # the machine, against the profiling run of the baseline
+    base = ExperimentType.BASE_WITH_PERF_COUNTERS
+
+    def delta(field: DerivedField) -> Callable[[Dict[Any, Any]], float]:
+        return lambda stats: stats[(exp_type, field.name)] - stats[(base, field.name)]
+
+    return [
+        CrossExperimentDerivedField(
+            f"{prefix}.interference.llc_mpki_delta", delta(f_llc_mpki)
+        ),
+        CrossExperimentDerivedField(
+            f"{prefix}.interference.llc_miss_ratio_delta", delta(f_llc_miss_ratio)
+        ),
+        CrossExperimentDerivedField(
+            f"{prefix}.interference.dtlb_mpki_delta", delta(f_dtlb_mpki)
+        ),
+        CrossExperimentDerivedField(
+            f"{prefix}.interference.dtlb_miss_ratio_delta", delta(f_dtlb_miss_ratio)
+        ),
+        CrossExperimentDerivedField(
+            f"{prefix}.interference.ipc_delta",
+            lambda stats: stats[(exp_type, f_ipc.name)] / stats[(base, f_ipc.name)]
+            - 1.0,
+        ),
+    ]
+
+
+(
+    f_parallaft_llc_mpki_delta,
+    f_parallaft_llc_miss_ratio_delta,
+    f_parallaft_dtlb_mpki_delta,
+    f_parallaft_dtlb_miss_ratio_delta,
+    f_parallaft_ipc_delta,
+) = make_interference_fields(ExperimentType.PARALLAFT, "parallaft")
+
+(
+    f_raft_llc_mpki_delta,
+    f_raft_llc_miss_ratio_delta,
+    f_raft_dtlb_mpki_delta,
+    f_raft_dtlb_miss_ratio_delta,
+    f_raft_ipc_delta,
+) = make_interference_fields(ExperimentType.RAFT, "raft")
+
+CROSS_EXP_DERIVED_FIELD_LIST += [
+    f_parallaft_llc_mpki_delta,
+    f_parallaft_llc_miss_ratio_delta,
+    f_parallaft_dtlb_mpki_delta,
+    f_parallaft_dtlb_miss_ratio_delta,
+    f_parallaft_ipc_delta,
+    f_raft_llc_mpki_delta,
+    f_raft_llc_miss_ratio_delta,
+    f_raft_dtlb_mpki_delta,
+    f_raft_dtlb_miss_ratio_delta,
+    f_raft_ipc_delta,
+]
+
+
+def make_variant_overhead_perf_field(
+    exp_type: ExperimentType,
+) -> CrossExperimentDerivedField[float]:
+    return CrossExperimentDerivedField(
+        f"{exp_type.value}.overhead.perf",
+        lambda stats: (
+            stats[(exp_type, f_all_wall_time.name)]
+            - stats[(ExperimentType.BASE, f_main_wall_time.name)]
+        )
+        / stats[(ExperimentType.BASE, f_main_wall_time.name)],
+    )
+
+
+def make_variant_delta_perf_field(
+    exp_type: ExperimentType,
+) -> CrossExperimentDerivedField[float]:
+    # the change in overhead of a variant against full Parallaft, relative to
+    # the base run time, so that deltas of different variants add up
+    return CrossExperimentDerivedField(
+        f"{exp_type.value}.delta.perf",
+        lambda stats: (
+            stats[(exp_type, f_all_wall_time.name)]
+            - stats[(ExperimentType.PARALLAFT, f_all_wall_time.name)]
+        )
+        / stats[(ExperimentType.BASE, f_main_wall_time.name)],
+    )
+
+
+F_ABLATION_OVERHEAD_PERF = {
+    ty: make_variant_overhead_perf_field(ty) for ty in ABLATION_VARIANT_LIST
+}
+F_ABLATION_DELTA_PERF = {
+    ty: make_variant_delta_perf_field(ty) for ty in ABLATION_VARIANT_LIST
+}
+
+CROSS_EXP_DERIVED_FIELD_LIST += list(F_ABLATION_OVERHEAD_PERF.values())
+CROSS_EXP_DERIVED_FIELD_LIST += list(F_ABLATION_DELTA_PERF.values())
+
 CROSS_EXP_DERIVED_FIELD_LIST_DICT = {f.name: f for f in CROSS_EXP_DERIVED_FIELD_LIST}
 
 ALL_FIELD_DICT = {f.name: f for f in FIELD_LIST + DERIVED_FIELD_LIST}
 
 
+MANIFEST_FILENAME = "manifest.json"
+MANIFEST_STATE_COMPLETE = "complete"
+HARNESS_FILENAME = "harness.txt"
+WORKLOADS_FILENAME = "workloads.json"
+
+
+class StatsFileError(ValueError):
+    pass
+
+
+def open_text(filename: str):
+    # logs may have been compressed with zstd by logstore.py
+    if not os.path.exists(filename) and os.path.exists(filename + ".zst"):
+        import zstandard
+
+        return io.TextIOWrapper(
+            zstandard.ZstdDecompressor().stream_reader(
+                open(filename + ".zst", "rb"), closefd=True
+            ),
+            encoding="utf-8",
+        )
+
+    return open(filename, "r")
+
+
+# printed by GNU time before its own format when the command fails
+GNU_TIME_EXIT_PREFIX = "Command exited with non-zero status "
+GNU_TIME_SIGNAL_PREFIX = "Command terminated by signal "
+
+
 def parse_stats_file(filename: str) -> Dict[str, Any]:
     out = {}
+    exit_status = None
 
-    with open(filename, "r") as f:
-        for line in f.readlines():
-            try:
-                k, v = line.split("=", 2)
-                if k in FIELD_DICT:
-                    v = FIELD_DICT[k].type(v)
+    with open_text(filename) as f:
+        content = f.read()
 
-                out[k] = v
-            except:
-                pass
+    # stats are written line by line, so a truncated file doesn't end with a newline
+    if len(content) == 0:
+        raise StatsFileError(f"{filename}: empty stats file")
+
+    if not content.endswith("\n"):
+        raise StatsFileError(f"{filename}: truncated stats file")
+
+    for line in content.splitlines(keepends=True):
+        try:
+            if line.startswith(GNU_TIME_EXIT_PREFIX):
+                exit_status = int(line[len(GNU_TIME_EXIT_PREFIX) :])
+                continue
+
+            if line.startswith(GNU_TIME_SIGNAL_PREFIX):
+                # same as the shell's status of a killed command, as %x is 0
+                exit_status = 128 + int(line[len(GNU_TIME_SIGNAL_PREFIX) :])
+                continue
+
+            k, v = line.split("=", 1)
+            if k in FIELD_DICT:
+                v = FIELD_DICT[k].type(v)
+
+            out[k] = v
+        except ValueError:
+            pass
+
+    if exit_status is not None:
+        out[f_exit_status.name] = exit_status
+
+    return out
+
+
+def load_manifest(dir_name: str) -> Union[Dict[str, Any], None]:
+    try:
+        with open(os.path.join(dir_name, MANIFEST_FILENAME), "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        # experiments run before manifests were introduced
+        return None
+
+
+_shown_warnings = set()
+
+
+def warn_once(dir_name: str, message: str):
+    if (dir_name, message) not in _shown_warnings:
+        _shown_warnings.add((dir_name, message))
+        print(f"Warning: {dir_name}: {message}", file=sys.stderr)
+
+
+def sha256_file(filename: str) -> str:
+    h = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for chunk in iter(partial(f.read, 1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def verify_stats_file(
+    dir_name: str, manifest: Union[Dict[str, Any], None], filename: str
+):
+    if manifest is None:
+        return
+
+    if manifest["state"] != MANIFEST_STATE_COMPLETE:
+        warn_once(
+            dir_name, f"experiment is {manifest['state']}, results may be partial"
+        )
+
+    rel_path = os.path.relpath(filename, dir_name)
+    checksum = manifest["files"].get(rel_path)
+
+    if checksum is not None and sha256_file(filename) != checksum:
+        raise StatsFileError(f"{filename}: checksum mismatch")
+
+
+def count_cpus(cpu_set: str) -> int:
+    count = 0
+
+    for part in cpu_set.split(","):
+        if "-" in part:
+            first, last = part.split("-", 1)
+            count += int(last) - int(first) + 1
+        elif part:
+            count += 1
+
+    return count
+
+
+def get_cmd_filename(stats_filename: str) -> str:
+    result_dir, name = os.path.split(stats_filename)
+    log_dir = os.path.join(os.path.dirname(result_dir), "log")
+    return os.path.join(log_dir, name.removesuffix(".stats.txt") + ".cmd")
+
+
+def parse_cmd_file(filename: str) -> Dict[str, Any]:
+    out = {}
+
+    try:
+        with open_text(filename) as f:
+            args = f.read().split()
+    except FileNotFoundError:
+        return out
+
+    for flag, value in zip(args, args[1:]):
+        if flag in CMD_FIELD_FLAGS:
+            if flag.endswith("-cpu-set"):
+                out[CMD_FIELD_FLAGS[flag].name] = count_cpus(value)
+            else:
+                out[CMD_FIELD_FLAGS[flag].name] = int(value)
 
     return out
 
@@ -330,6 +653,7 @@ def sum_stats_file(filenames: Sequence[str]) -> OrderedDict[str, Any]:
 
     for filename in filenames:
         stats = parse_stats_file(filename)
+        stats.update(parse_cmd_file(get_cmd_filename(filename)))
 
         for f in FIELD_LIST:
             if f.name in stats:
@@ -351,6 +675,138 @@ def sum_stats_file(filenames: Sequence[str]) -> OrderedDict[str, Any]:
     return stats_sum
 
 
+def load_workload_benchmarks(dir_name: str) -> List[Benchmark]:
+    # workloads run from a manifest by run.py, which records their result names
+    try:
+        with open(os.path.join(dir_name, WORKLOADS_FILENAME), "r") as f:
+            workloads = json.load(f)
+    except FileNotFoundError:
+        return []
+
+    return [
+        Benchmark(
+            "workload", "workload", w["name"], w["filename"], w["sub_run_hashes"]
+        )
+        for w in workloads
+    ]
+
+
+def discover_benchmarks(experiment_dirs: Dict[Any, str]) -> List[Benchmark]:
+    benchmarks = OrderedDict()
+
+    for dir_name in experiment_dirs.values():
+        for b in load_workload_benchmarks(dir_name):
+            benchmarks.setdefault(b.name, b)
+
+    if len(benchmarks) == 0:
+        return list(BENCHMARKS)
+
+    return list(benchmarks.values())
+
+
+def load_benchmark_stats(
+    dir_name: str, benchmark: Benchmark, strict: bool = False
+) -> OrderedDict[str, Any]:
+    filenames = [
+        glob(
+            f"{dir_name}/result/{sub_run_hash}-{benchmark.filename}.releval*.stats.txt"
+        )
+        for sub_run_hash in benchmark.sub_run_hashes
+    ]
+
+    filenames = [filename[0] if len(filename) > 0 else None for filename in filenames]
+
+    if None in filenames:
+        return OrderedDict()
+
+    # read per benchmark rather than cached, so that files written since the
+    # last call are checked against the current manifest
+    manifest = load_manifest(dir_name)
+
+    try:
+        for filename in filenames:
+            verify_stats_file(dir_name, manifest, filename)  # type: ignore
+
+        stats = sum_stats_file(filenames)  # type: ignore
+    except StatsFileError as e:
+        if strict:
+            raise
+        warn_once(dir_name, f"ignoring {benchmark.name}: {e}")
+        return OrderedDict()
+
+    calculate_derived_fields(stats)
+    return stats
+
+
+def sample_variance(samples: Sequence[float]) -> float:
+    mean = sum(samples) / len(samples)
+    return sum((x - mean) ** 2 for x in samples) / (len(samples) - 1)
+
+
+# Quantile of Student's t distribution for p > 0.5. With x = sqrt(df) * tan(a),
+# P(0 < T < x) is proportional to the integral of cos(a)^(df - 1) from 0 to a,
+# which is smooth for df >= 1, so it is integrated with Simpson's rule and
+# inverted by bisection. The integrand gets too narrow for large df, where the
+# first terms of the Cornish-Fisher expansion are accurate to 1e-5.
+def student_t_quantile(p: float, df: float) -> float:
+    if df > 1000:
+        z = NormalDist().inv_cdf(p)
+        return z + (z**3 + z) / (4 * df)
+
+    scale = math.exp(math.lgamma((df + 1) / 2) - math.lgamma(df / 2)) / math.sqrt(
+        math.pi
+    )
+    n = 256
+
+    def cdf(a: float) -> float:
+        h = a / n
+        inner = sum(
+            (4 if i % 2 else 2) * math.cos(i * h) ** (df - 1) for i in range(1, n)
+        )
+        return 0.5 + scale * h / 3 * (1 + math.cos(a) ** (df - 1) + inner)
+
+    lo, hi = 0.0, math.pi / 2
+    for _ in range(60):
+        mid = (lo + hi) / 2
+        if cdf(mid) < p:
+            lo = mid
+        else:
+            hi = mid
+
+    return math.sqrt(df) * math.tan((lo + hi) / 2)
+
+
+# Returns the overhead of the target over the base, i.e. the ratio of their
+# sample means minus one, and the half-width of its confidence interval. The
+# variances of both means are propagated with the delta method, and the
+# degrees of freedom follow the Welch-Satterthwaite approximation. With a
+# single base sample, its variance is unknown and left out.
+def overhead_confidence_interval(
+    target: Sequence[float], base: Sequence[float], level: float = 0.95
+) -> Tuple[float, float]:
+    mean_target = sum(target) / len(target)
+    mean_base = sum(base) / len(base)
+    ratio = mean_target / mean_base
+
+    if len(target) < 2:
+        return ratio - 1.0, float("inf")
+
+    # squared relative standard errors of the means and their degrees of freedom
+    terms = [
+        (sample_variance(s) / (len(s) * mean**2), len(s) - 1)
+        for s, mean in ((target, mean_target), (base, mean_base))
+        if len(s) >= 2
+    ]
+    rel_var = sum(v for v, _ in terms)
+
+    if rel_var == 0:
+        return ratio - 1.0, 0.0
+
+    df = rel_var**2 / sum(v**2 / n for v, n in terms)
+    half_width = student_t_quantile((1 + level) / 2, df) * ratio * math.sqrt(rel_var)
+    return ratio - 1.0, half_width
+
+
 def calculate_derived_fields(stats: OrderedDict[str, Any]):
     for f in DERIVED_FIELD_LIST:
         try:
@@ -393,28 +849,47 @@ FIELD_GROUPS = {
         (ExperimentType.CROSS_EXP_DERIVED, f_parallaft_overhead_perf_last_checker_sync),
         (ExperimentType.CROSS_EXP_DERIVED, f_parallaft_overhead_perf_runtime_work),
     ],
+    "parallaft_checker_utilization": [
+        (ExperimentType.PARALLAFT, f_checker_utilization),
+        (ExperimentType.PARALLAFT, f_checker_cpu_time_ratio),
+    ],
+    "parallaft_ablation": [
+        (ExperimentType.CROSS_EXP_DERIVED, f_parallaft_overhead_perf),
+        *[
+            (ExperimentType.CROSS_EXP_DERIVED, f)
+            for f in F_ABLATION_OVERHEAD_PERF.values()
+        ],
+    ],
+    "parallaft_ablation_delta": [
+        (ExperimentType.CROSS_EXP_DERIVED, f) for f in F_ABLATION_DELTA_PERF.values()
+    ],
+    "parallaft_interference": [
+        (ExperimentType.CROSS_EXP_DERIVED, f_parallaft_llc_mpki_delta),
+        (ExperimentType.CROSS_EXP_DERIVED, f_parallaft_dtlb_mpki_delta),
+        (ExperimentType.CROSS_EXP_DERIVED, f_parallaft_ipc_delta),
+        (
+            ExperimentType.CROSS_EXP_DERIVED,
+            f_parallaft_overhead_perf_resource_contention,
+        ),
+    ],
+    "raft_interference": [
+        (ExperimentType.CROSS_EXP_DERIVED, f_raft_llc_mpki_delta),
+        (ExperimentType.CROSS_EXP_DERIVED, f_raft_dtlb_mpki_delta),
+        (ExperimentType.CROSS_EXP_DERIVED, f_raft_ipc_delta),
+    ],
+    "parallaft_checker_parallelism": [
+        (ExperimentType.PARALLAFT, f_checker_cpu_count),
+        (ExperimentType.PARALLAFT, f_checker_parallelism),
+        (ExperimentType.PARALLAFT, f_checker_slack),
+        (ExperimentType.PARALLAFT, f_max_nr_live_segments),
+    ],
 }
 
 
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("fields", nargs="+")
-    parser.add_argument("--no-header", action="store_true")
-    parser.add_argument("--no-names", action="store_true")
-    parser.add_argument("--no-bench-number", action="store_true")
-    parser.add_argument("--sep", default=",")
-    parser.add_argument("--output")
-    parser.add_argument("--scale", default=1.0, type=float)
-    parser.add_argument("--geomean", action="store_true")
-
-    for ty in EXPERIMENT_TYPE_LIST:
-        parser.add_argument(f"--{ty.value}")
-
-    args = parser.parse_args()
-
+def parse_field_specs(specs: Sequence[str]) -> List[Tuple[ExperimentType, Any]]:
     fields = []
 
-    for f in args.fields:
+    for f in specs:
         if f in FIELD_GROUPS:
             fields.extend(FIELD_GROUPS[f])
         elif f in CROSS_EXP_DERIVED_FIELD_LIST_DICT:
@@ -435,45 +910,26 @@ def main():
             else:
                 raise ValueError(f"Unknown field: {field_name}")
 
-    out = []
+    return fields
 
-    experiment_dirs = {}
-    for ty in EXPERIMENT_TYPE_LIST:
-        dir_name = getattr(args, ty.value)
-        if dir_name is not None:
-            experiment_dirs[ty] = dir_name
-
-    if len(experiment_dirs) == 0:
-        print("No experiment directories are specified", file=sys.stderr)
-        sys.exit(1)
-
-    for benchmark in BENCHMARKS:
-        exp_stats = OrderedDict()
-
-        for exp_type, dir_name in experiment_dirs.items():
-            filenames = [
-                glob(
-                    f"{dir_name}/result/{sub_run_hash}-{benchmark.filename}.releval*.stats.txt"
-                )
-                for sub_run_hash in benchmark.sub_run_hashes
-            ]
 
-            filenames = [
-                filename[0] if len(filename) > 0 else None for filename in filenames
-            ]
+def collect_exp_stats(
+    experiment_dirs: Dict[ExperimentType, str], strict: bool = False
+) -> List[Tuple[Benchmark, OrderedDict[(ExperimentType, str), Any]]]:
+    return ResultTable(experiment_dirs, strict=strict).all_exp_stats()
 
-            if None in filenames:
-                stats = OrderedDict()
-            else:
-                stats = sum_stats_file(filenames)
-                calculate_derived_fields(stats)
 
-            exp_stats.update(with_experiment_type(exp_type, stats))
-
-        calculate_cross_exp_derived_fields(exp_stats)
+def make_table(
+    all_exp_stats: List[Tuple[Benchmark, OrderedDict[(ExperimentType, str), Any]]],
+    fields: List[Tuple[ExperimentType, Any]],
+    no_bench_number: bool = False,
+    geomean: bool = False,
+) -> List[List[Any]]:
+    out = []
 
-        if args.no_bench_number:
-            _, benchmark_name = benchmark.name.split(".", 2)
+    for benchmark, exp_stats in all_exp_stats:
+        if no_bench_number:
+            benchmark_name = benchmark.name.split(".", 1)[-1]
         else:
             benchmark_name = benchmark.name
 
@@ -482,7 +938,7 @@ def main():
             + [exp_stats.get((e, f.name), float("nan")) for e, f in fields]
         )
 
-    if args.geomean:
+    if geomean:
         a = np.array(list(zip(*out))[1:], dtype=float) + 1.0
         geomean = a.prod(axis=1) ** (1 / a.shape[1]) - 1.0
         out.append(
@@ -492,23 +948,491 @@ def main():
             ]
         )
 
-    out_buf = ""
+    return out
+
+
+# components of Parallaft's overhead, each measured as the overhead removed by
+# a variant that disables it
+ABLATION_REMOVAL_STEPS = [
+    ("Fork and COW", ExperimentType.PARALLAFT_NOFORK),
+    ("Memory comparison", ExperimentType.PARALLAFT_NOMEMCHECK),
+]
+
+# runtime policies applied on top of Parallaft one after another, each step is
+# the overhead change against the previous one
+ABLATION_POLICY_STEPS = [
+    ("Dynamic slicing", ExperimentType.PARALLAFT_DYNSLICING),
+    ("Frequency scaling", ExperimentType.PARALLAFT_DYN2),
+]
+
+
+def get_ablation_overheads(
+    all_exp_stats: List[Tuple[Benchmark, OrderedDict[(ExperimentType, str), Any]]]
+) -> Dict[ExperimentType, float]:
+    # geomean performance overhead of Parallaft and each variant
+    table = make_table(all_exp_stats, FIELD_GROUPS["parallaft_ablation"], geomean=True)
+    exp_types = [ExperimentType.PARALLAFT] + ABLATION_VARIANT_LIST
+    return OrderedDict(zip(exp_types, table[-1][1:]))
+
+
+def make_ablation_waterfall(
+    overheads: Dict[ExperimentType, float]
+) -> List[Tuple[str, float, bool]]:
+    # (label, value, is_total) bars, where the steps between two totals add up
+    # to their difference
+    parallaft_overhead = overheads.get(ExperimentType.PARALLAFT, float("nan"))
+    if math.isnan(parallaft_overhead):
+        return []
+
+    bars = []
+    remaining = parallaft_overhead
+
+    for label, exp_type in ABLATION_REMOVAL_STEPS:
+        overhead = overheads.get(exp_type, float("nan"))
+        if not math.isnan(overhead):
+            bars.append((label, parallaft_overhead - overhead, False))
+            remaining -= parallaft_overhead - overhead
+
+    bars.append(("Other runtime work", remaining, False))
+    bars.append(("Parallaft", parallaft_overhead, True))
+
+    policy_bars = []
+    prev_overhead = parallaft_overhead
 
-    if not args.no_header:
-        out_buf += args.sep.join(
-            ["name"] + list(map(lambda f: f[0].value + ":" + f[1].name, fields))
-        ) + "\n"
+    for label, exp_type in ABLATION_POLICY_STEPS:
+        overhead = overheads.get(exp_type, float("nan"))
+        if math.isnan(overhead):
+            break
+        policy_bars.append((label, overhead - prev_overhead, False))
+        prev_overhead = overhead
 
-    for line in out:
-        if args.no_names:
-            line = line[1:]
+    if len(policy_bars) > 0:
+        bars += policy_bars
+        bars.append(("With dynamic policies", prev_overhead, True))
+
+    return bars
+
+
+FieldSpec = Union[str, Tuple[ExperimentType, Any]]
+
+
+def nan_to_none(x: Any) -> Any:
+    return None if isinstance(x, float) and math.isnan(x) else x
+
+
+def format_field_spec(field: Tuple[ExperimentType, Any]) -> str:
+    return field[0].value + ":" + field[1].name
+
+
+def get_dir_version(dir_name: str) -> Tuple[int, int]:
+    # results are published by renaming into the result directory, which bumps
+    # its mtime, and manifests are replaced on completion
+    versions = []
+    for path in (
+        os.path.join(dir_name, "result"),
+        os.path.join(dir_name, MANIFEST_FILENAME),
+    ):
+        try:
+            versions.append(os.stat(path).st_mtime_ns)
+        except FileNotFoundError:
+            versions.append(0)
+    return tuple(versions)  # type: ignore
+
+
+class ResultTable:
+    # Lazily loads per-benchmark stats of a set of experiments. Each
+    # (experiment, benchmark) pair is read from disk once and memoized until
+    # the experiment directory changes.
+
+    def __init__(
+        self,
+        experiment_dirs: Dict[ExperimentType, str],
+        benchmarks: Optional[Sequence[Benchmark]] = None,
+        strict: bool = False,
+    ):
+        self.experiment_dirs = dict(experiment_dirs)
+        if benchmarks is None:
+            benchmarks = discover_benchmarks(experiment_dirs)
+        self.benchmarks = list(benchmarks)
+        self.strict = strict
+        self._stats: Dict[Tuple[ExperimentType, str], OrderedDict[str, Any]] = {}
+        self._exp_stats: Dict[str, OrderedDict[(ExperimentType, str), Any]] = {}
+        self._versions: Dict[ExperimentType, Tuple[int, int]] = {}
+
+    def refresh(self):
+        changed = False
+
+        for exp_type, dir_name in self.experiment_dirs.items():
+            version = get_dir_version(dir_name)
+            if self._versions.get(exp_type) != version:
+                self._versions[exp_type] = version
+                for key in [k for k in self._stats if k[0] == exp_type]:
+                    del self._stats[key]
+                changed = True
+
+        if changed:
+            self._exp_stats.clear()
+
+    def benchmark_stats(
+        self, exp_type: ExperimentType, benchmark: Benchmark
+    ) -> OrderedDict[str, Any]:
+        key = (exp_type, benchmark.name)
+        if key not in self._stats:
+            self._stats[key] = load_benchmark_stats(
+                self.experiment_dirs[exp_type], benchmark, self.strict
+            )
+        return self._stats[key]
+
+    def exp_stats(
+        self, benchmark: Benchmark
+    ) -> OrderedDict[(ExperimentType, str), Any]:
+        if benchmark.name not in self._exp_stats:
+            exp_stats = OrderedDict()
+            for exp_type in self.experiment_dirs:
+                exp_stats.update(
+                    with_experiment_type(
+                        exp_type, self.benchmark_stats(exp_type, benchmark)
+                    )
+                )
+            calculate_cross_exp_derived_fields(exp_stats)
+            self._exp_stats[benchmark.name] = exp_stats
+        return self._exp_stats[benchmark.name]
+
+    def all_exp_stats(
+        self,
+    ) -> List[Tuple[Benchmark, OrderedDict[(ExperimentType, str), Any]]]:
+        self.refresh()
+        return [(b, self.exp_stats(b)) for b in self.benchmarks]
+
+    def select(self, *specs: FieldSpec) -> "ResultView":
+        fields = []
+        for spec in specs:
+            if isinstance(spec, str):
+                fields.extend(parse_field_specs([spec]))
+            else:
+                fields.append(spec)
+        return ResultView(self, fields)
+
+
+class ResultView:
+    # A selection of fields over a ResultTable, evaluated when exported
+
+    def __init__(self, table: ResultTable, fields: List[Tuple[ExperimentType, Any]]):
+        self.table = table
+        self.fields = fields
+
+    @property
+    def field_names(self) -> List[str]:
+        return [format_field_spec(f) for f in self.fields]
+
+    def rows(
+        self, no_bench_number: bool = False, geomean: bool = False
+    ) -> List[List[Any]]:
+        return make_table(
+            self.table.all_exp_stats(), self.fields, no_bench_number, geomean
+        )
+
+    def to_numpy(self, geomean: bool = False) -> np.ndarray:
+        # shape: (benchmarks [+ geomean], fields), missing values are NaN
+        return np.array(
+            [row[1:] for row in self.rows(geomean=geomean)], dtype=float
+        ).reshape(-1, len(self.fields))
+
+    def to_dict(
+        self, no_bench_number: bool = False, geomean: bool = False
+    ) -> Dict[str, Dict[str, Any]]:
+        out = OrderedDict()
+        for row in self.rows(no_bench_number, geomean):
+            out[row[0]] = OrderedDict(
+                (name, nan_to_none(v)) for name, v in zip(self.field_names, row[1:])
+            )
+        return out
+
+    def to_json(
+        self, no_bench_number: bool = False, geomean: bool = False, **kwargs
+    ) -> str:
+        return json.dumps(self.to_dict(no_bench_number, geomean), **kwargs)
+
+    def to_csv(
+        self,
+        sep: str = ",",
+        scale: float = 1.0,
+        header: bool = True,
+        names: bool = True,
+        no_bench_number: bool = False,
+        geomean: bool = False,
+        float_format: str = "{:.4f}",
+    ) -> str:
+        out_buf = ""
+
+        if header:
+            out_buf += sep.join(["name"] + self.field_names) + "\n"
 
         def stringify_and_scale(x):
             if isinstance(x, float):
-                return "{:.4f}".format(x * args.scale)
+                return float_format.format(x * scale)
             return str(x)
 
-        out_buf += args.sep.join(map(stringify_and_scale, line)) + "\n"
+        for line in self.rows(no_bench_number, geomean):
+            if not names:
+                line = line[1:]
+            out_buf += sep.join(map(stringify_and_scale, line)) + "\n"
+
+        return out_buf
+
+    def to_arrow(self, no_bench_number: bool = False, geomean: bool = False):
+        import pyarrow
+
+        rows = self.rows(no_bench_number, geomean)
+        columns = {"name": [row[0] for row in rows]}
+        for i, name in enumerate(self.field_names):
+            columns[name] = [nan_to_none(row[i + 1]) for row in rows]
+        return pyarrow.table(columns)
+
+
+def load_results(
+    experiment_dirs: Dict[ExperimentType, str], strict: bool = False
+) -> ResultTable:
+    return ResultTable(experiment_dirs, strict=strict)
+
+
+class HarnessTiming(NamedTuple):
+    # all times are in microseconds, as recorded by spec_submit.sh
+    submit_start: int
+    submit_end: int
+    setup: int
+    run: int
+    teardown: int
+    submit_gap: int = 0
+
+
+def parse_harness_lines(filename: str) -> List[Tuple[str, int]]:
+    with open(filename, "r") as f:
+        return [
+            (k.removeprefix("harness.").removesuffix("_us"), int(v))
+            for k, v in (line.split("=", 1) for line in f.read().splitlines())
+        ]
+
+
+def parse_harness_file(filename: str) -> Dict[str, int]:
+    return dict(parse_harness_lines(filename))
+
+
+def parse_harness_runs(filename: str) -> List[Dict[str, int]]:
+    # every run into the experiment directory appends its own phases, starting
+    # with spec_start
+    runs = []
+
+    for k, v in parse_harness_lines(filename):
+        if k == "spec_start" or not runs:
+            runs.append({})
+        runs[-1][k] = v
+
+    return runs
+
+
+def load_harness_runs(dir_name: str) -> List[Dict[str, int]]:
+    try:
+        return parse_harness_runs(os.path.join(dir_name, HARNESS_FILENAME))
+    except FileNotFoundError:
+        return []
+    except ValueError:
+        warn_once(dir_name, f"ignoring malformed {HARNESS_FILENAME}")
+        return []
+
+
+def load_harness_timings(dir_name: str) -> Dict[str, HarnessTiming]:
+    timings = {}
+
+    for filename in glob(f"{dir_name}/result/*.harness.txt"):
+        try:
+            t = parse_harness_file(filename)
+            timings[os.path.basename(filename)] = HarnessTiming(
+                t["submit_start"], t["submit_end"], t["setup"], t["run"], t["teardown"]
+            )
+        except (KeyError, ValueError):
+            warn_once(dir_name, f"ignoring malformed harness timings {filename}")
+
+    spec_starts = [
+        r["spec_start"] for r in load_harness_runs(dir_name) if "spec_start" in r
+    ]
+
+    # runspec's own work between two submits (copying inputs, validating
+    # outputs) is charged to the sub-run submitted after it, and so is the work
+    # from the start of the run to its first submit
+    prev_end = None
+    for name, t in sorted(timings.items(), key=lambda x: x[1].submit_start):
+        run_start = max((s for s in spec_starts if s <= t.submit_start), default=None)
+        if run_start is not None and (prev_end is None or run_start > prev_end):
+            prev_end = run_start
+        if prev_end is not None:
+            timings[name] = t._replace(submit_gap=max(0, t.submit_start - prev_end))
+        prev_end = t.submit_end
+
+    return timings
+
+
+HARNESS_REPORT_COLUMNS = [
+    "experiment",
+    "name",
+    "sub_runs",
+    "benchmark_time",
+    "setup_time",
+    "teardown_time",
+    "runspec_time",
+    "finalize_time",
+    "overhead",
+]
+
+
+def make_harness_report(
+    experiment_dirs: Dict[ExperimentType, str],
+    benchmarks: Optional[Sequence[Benchmark]] = None,
+) -> List[List[Any]]:
+    # times are in seconds, overhead is the harness time relative to the
+    # benchmark time
+    out = []
+
+    if benchmarks is None:
+        benchmarks = discover_benchmarks(experiment_dirs)
+
+    def make_row(exp_type, name, timings, runspec_time=None, finalize_time=0.0):
+        run = sum(t.run for t in timings) / 1e6
+        setup = sum(t.setup for t in timings) / 1e6
+        teardown = sum(t.teardown for t in timings) / 1e6
+        if runspec_time is None:
+            runspec_time = sum(t.submit_gap for t in timings) / 1e6
+        harness_time = setup + teardown + runspec_time + finalize_time
+        return [
+            exp_type.value,
+            name,
+            len(timings),
+            run,
+            setup,
+            teardown,
+            runspec_time,
+            finalize_time,
+            harness_time / run if run > 0 else float("nan"),
+        ]
+
+    for exp_type, dir_name in experiment_dirs.items():
+        timings = load_harness_timings(dir_name)
+        if len(timings) == 0:
+            warn_once(dir_name, "no harness timings recorded")
+            continue
+
+        for benchmark in benchmarks:
+            bench_timings = [
+                t
+                for sub_run_hash in benchmark.sub_run_hashes
+                for name, t in timings.items()
+                if name.startswith(f"{sub_run_hash}-{benchmark.filename}.releval")
+            ]
+            if len(bench_timings) > 0:
+                out.append(make_row(exp_type, benchmark.name, bench_timings))
+
+        all_timings = list(timings.values())
+        runspec_time = sum(t.submit_gap for t in all_timings) / 1e6
+        finalize_time = 0.0
+
+        for run in load_harness_runs(dir_name):
+            try:
+                spec_start, spec_end = run["spec_start"], run["spec_end"]
+                experiment_end = run["experiment_end"]
+            except KeyError:
+                warn_once(dir_name, f"ignoring incomplete run in {HARNESS_FILENAME}")
+                continue
+
+            last_end = max(
+                (
+                    t.submit_end
+                    for t in all_timings
+                    if spec_start <= t.submit_start <= spec_end
+                ),
+                default=spec_start,
+            )
+            runspec_time += max(0, spec_end - last_end) / 1e6
+            finalize_time += (experiment_end - spec_end) / 1e6
+
+        out.append(
+            make_row(exp_type, "total", all_timings, runspec_time, finalize_time)
+        )
+
+    return out
+
+
+def format_harness_report(
+    rows: List[List[Any]], sep: str = ",", float_format: str = "{:.4f}"
+) -> str:
+    out_buf = sep.join(HARNESS_REPORT_COLUMNS) + "\n"
+
+    for row in rows:
+        out_buf += (
+            sep.join(
+                float_format.format(x) if isinstance(x, float) else str(x) for x in row
+            )
+            + "\n"
+        )
+
+    return out_buf
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("fields", nargs="*")
+    parser.add_argument("--no-header", action="store_true")
+    parser.add_argument("--no-names", action="store_true")
+    parser.add_argument("--no-bench-number", action="store_true")
+    parser.add_argument("--sep", default=",")
+    parser.add_argument("--output")
+    parser.add_argument("--scale", default=1.0, type=float)
+    parser.add_argument("--geomean", action="store_true")
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="fail on truncated or corrupted stats files instead of skipping them",
+    )
+    parser.add_argument(
+        "--harness-report",
+        action="store_true",
+        help="report the time spent in the harness against the benchmark time",
+    )
+
+    for ty in EXPERIMENT_TYPE_LIST:
+        parser.add_argument(f"--{ty.value}")
+
+    args = parser.parse_args()
+
+    if len(args.fields) == 0 and not args.harness_report:
+        parser.error("no fields are specified")
+
+    fields = parse_field_specs(args.fields)
+
+    experiment_dirs = {}
+    for ty in EXPERIMENT_TYPE_LIST:
+        dir_name = getattr(args, ty.value)
+        if dir_name is not None:
+            experiment_dirs[ty] = dir_name
+
+    if len(experiment_dirs) == 0:
+        print("No experiment directories are specified", file=sys.stderr)
+        sys.exit(1)
+
+    if args.harness_report:
+        out_buf = format_harness_report(make_harness_report(experiment_dirs), args.sep)
+    else:
+        out_buf = (
+            load_results(experiment_dirs, args.strict)
+            .select(*fields)
+            .to_csv(
+                args.sep,
+                args.scale,
+                not args.no_header,
+                not args.no_names,
+                args.no_bench_number,
+                args.geomean,
+            )
+        )
 
     if args.output:
         with open(args.output, "wt") as f:
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+
+from typing import Dict, List, NamedTuple
+from pathlib import Path
+import argparse
+import sys
+
+import numpy as np
+
+from collect_stats import (
+    EXPERIMENT_TYPE_LIST,
+    ExperimentType,
+    collect_exp_stats,
+    f_parallaft_dtlb_mpki_delta,
+    f_parallaft_ipc_delta,
+    f_parallaft_llc_mpki_delta,
+    f_parallaft_overhead_perf_resource_contention,
+    make_table,
+)
+
+PREDICTORS = [f_parallaft_llc_mpki_delta, f_parallaft_dtlb_mpki_delta]
+PREDICTOR_TITLES = ["LLC MPKI increase", "DTLB MPKI increase"]
+RESPONSE = f_parallaft_overhead_perf_resource_contention
+
+
+class InterferenceResult(NamedTuple):
+    names: List[str]
+    # shape: (benchmarks, predictors)
+    x: np.ndarray
+    # shape: (benchmarks,)
+    ipc_delta: np.ndarray
+    contention: np.ndarray
+    # joint fit, intercept followed by one coefficient per predictor
+    coefficients: np.ndarray
+    r_squared: float
+    # per-predictor fits, shape: (predictors, 2) for intercept and slope
+    simple_fits: np.ndarray
+    correlations: np.ndarray
+
+    @property
+    def explained(self) -> np.ndarray:
+        # the part of each benchmark's contention overhead the fit attributes
+        # to shared-cache and TLB pressure
+        return self.x @ self.coefficients[1:]
+
+
+def fit_linear(x: np.ndarray, y: np.ndarray):
+    a = np.column_stack([np.ones(len(y)), x])
+    coefficients, _, _, _ = np.linalg.lstsq(a, y, rcond=None)
+
+    ss_res = np.sum((y - a @ coefficients) ** 2)
+    ss_tot = np.sum((y - np.mean(y)) ** 2)
+    r_squared = 1.0 - ss_res / ss_tot if ss_tot > 0 else float("nan")
+
+    return coefficients, r_squared
+
+
+def analyze_interference(
+    experiment_dirs: Dict[ExperimentType, str]
+) -> InterferenceResult:
+    for ty in (
+        ExperimentType.BASE,
+        ExperimentType.BASE_WITH_PERF_COUNTERS,
+        ExperimentType.PARALLAFT,
+    ):
+        if ty not in experiment_dirs:
+            raise RuntimeError(f"The {ty.value} experiment is required")
+
+    fields = [
+        (ExperimentType.CROSS_EXP_DERIVED, f)
+        for f in PREDICTORS + [f_parallaft_ipc_delta, RESPONSE]
+    ]
+    table = make_table(collect_exp_stats(experiment_dirs), fields, True)
+
+    names = [row[0] for row in table]
+    values = np.array([row[1:] for row in table], dtype=float)
+
+    # benchmarks without counters, e.g. when they are not enabled, are excluded
+    valid = ~np.any(np.isnan(values), axis=1)
+    names = [n for n, v in zip(names, valid) if v]
+    values = values[valid]
+
+    nr_predictors = len(PREDICTORS)
+    if len(names) < nr_predictors + 2:
+        raise RuntimeError(
+            f"Only {len(names)} benchmarks have cache and TLB counters, run Parallaft with --parallaft_count_cache_tlb_events"
+        )
+
+    x = values[:, :nr_predictors]
+    contention = values[:, -1]
+    coefficients, r_squared = fit_linear(x, contention)
+
+    simple_fits = np.array(
+        [fit_linear(x[:, [i]], contention)[0] for i in range(nr_predictors)]
+    )
+
+    with np.errstate(invalid="ignore"):
+        correlations = np.array(
+            [np.corrcoef(x[:, i], contention)[0, 1] for i in range(nr_predictors)]
+        )
+
+    return InterferenceResult(
+        names,
+        x,
+        values[:, nr_predictors],
+        contention,
+        coefficients,
+        r_squared,
+        simple_fits,
+        correlations,
+    )
+
+
+def format_table(result: InterferenceResult, sep: str = ",", scale: float = 1.0):
+    out = sep.join(
+        ["name"]
+        + [f.name for f in PREDICTORS]
+        + [f_parallaft_ipc_delta.name, RESPONSE.name, "explained"]
+    )
+    out += "\n"
+
+    for i, name in enumerate(result.names):
+        out += sep.join(
+            [name]
+            + ["{:.4f}".format(v) for v in result.x[i]]
+            + [
+                "{:.4f}".format(result.ipc_delta[i] * scale),
+                "{:.4f}".format(result.contention[i] * scale),
+                "{:.4f}".format(result.explained[i] * scale),
+            ]
+        )
+        out += "\n"
+
+    return out
+
+
+def format_fit(result: InterferenceResult, scale: float = 1.0) -> str:
+    out = f"Fit of {RESPONSE.name} over {len(result.names)} benchmarks:\n"
+    out += f"- intercept: {result.coefficients[0] * scale:.4f}\n"
+
+    for f, coefficient, (_, slope), r in zip(
+        PREDICTORS, result.coefficients[1:], result.simple_fits, result.correlations
+    ):
+        out += f"- {f.name}: {coefficient * scale:.4f} per unit, {slope * scale:.4f} alone (pearson r={r:.3f})\n"
+
+    out += f"- R^2: {result.r_squared:.3f}\n"
+
+    total = np.sum(result.contention)
+    if total != 0:
+        out += f"- share of contention explained by cache and TLB pressure: {np.sum(result.explained) / total:.1%}\n"
+
+    return out
+
+
+def plot_interference(result: InterferenceResult, path: Path, scale: float):
+    import matplotlib.pyplot as plt
+    from plot_stats import (
+        FIGURE_SIZE,
+        FONT_SIZE,
+        LEGEND_FONT_SIZE,
+        RASTER_DPI,
+        fill_color,
+    )
+
+    nr_predictors = len(PREDICTORS)
+    fig, axes = plt.subplots(
+        1,
+        nr_predictors,
+        figsize=(FIGURE_SIZE[0] * nr_predictors, FIGURE_SIZE[1] * 1.5),
+        sharey=True,
+        squeeze=False,
+    )
+
+    y = result.contention * scale
+
+    for i, (title, ax) in enumerate(zip(PREDICTOR_TITLES, axes.flat)):
+        x = result.x[:, i]
+        ax.scatter(x, y, s=8, color=fill_color("#44aaff"), edgecolor="black", lw=0.3)
+
+        intercept, slope = result.simple_fits[i]
+        xs = np.linspace(np.min(x), np.max(x), 2)
+        ax.plot(
+            xs,
+            (intercept + slope * xs) * scale,
+            color="red",
+            linewidth=0.8,
+            label=f"r={result.correlations[i]:.2f}",
+        )
+
+        ax.set_xlabel(title, fontsize=FONT_SIZE)
+        ax.tick_params(labelsize=LEGEND_FONT_SIZE)
+        ax.grid(linewidth=0.5)
+        ax.legend(fontsize=LEGEND_FONT_SIZE, frameon=False)
+
+    axes.flat[0].set_ylabel("Resource contention (%)", fontsize=FONT_SIZE)
+    fig.suptitle(f"R$^2$={result.r_squared:.2f}", fontsize=FONT_SIZE)
+    fig.tight_layout(pad=0.2)
+    fig.savefig(path, dpi=RASTER_DPI)
+    plt.close(fig)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--output")
+    parser.add_argument("--sep", default=",")
+    parser.add_argument("--scale", default=1.0, type=float)
+    parser.add_argument("--plot-dir", type=Path)
+    parser.add_argument("--format", nargs="+", default=["png"])
+
+    for ty in EXPERIMENT_TYPE_LIST:
+        parser.add_argument(f"--{ty.value}")
+
+    args = parser.parse_args()
+
+    experiment_dirs = {}
+    for ty in EXPERIMENT_TYPE_LIST:
+        dir_name = getattr(args, ty.value)
+        if dir_name is not None:
+            experiment_dirs[ty] = dir_name
+
+    try:
+        result = analyze_interference(experiment_dirs)
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    out_buf = format_table(result, args.sep, args.scale)
+
+    if args.output:
+        with open(args.output, "wt") as f:
+            f.write(out_buf)
+    else:
+        print(out_buf, end="")
+
+    print(format_fit(result, args.scale), end="", file=sys.stderr)
+
+    if args.plot_dir is not None:
+        args.plot_dir.mkdir(parents=True, exist_ok=True)
+        for fmt in args.format:
+            plot_interference(
+                result, args.plot_dir / f"interference_contention.{fmt}", 100.0
+            )
+
+
+if __name__ == "__main__":
+    main()
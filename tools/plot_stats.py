@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+
+from typing import Dict, List, NamedTuple, Tuple
+from pathlib import Path
+import argparse
+import sys
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import matplotlib.colors
+import matplotlib.pyplot as plt
+import numpy as np
+
+from collect_stats import (
+    EXPERIMENT_TYPE_LIST,
+    FIELD_GROUPS,
+    ExperimentType,
+    collect_exp_stats,
+    get_ablation_overheads,
+    make_ablation_waterfall,
+    make_table,
+)
+
+
+class Series(NamedTuple):
+    title: str
+    color: str
+
+
+class Figure(NamedTuple):
+    name: str
+    field_group: str
+    series: List[Series]
+    stacked: bool = False
+    ylabel: str = "Overhead (%)"
+    waterfall: bool = False
+
+
+FIGURES = [
+    Figure(
+        "performance_overhead",
+        "performance_overhead_parallaft_vs_raft",
+        [Series("Parallaft", "#44aaff"), Series("RAFT", "red")],
+    ),
+    Figure(
+        "performance_overhead_breakdown",
+        "parallaft_performance_overhead_breakdown",
+        [
+            Series("Fork and COW", "#1f77b4"),
+            Series("Resource contention", "#ff7f0e"),
+            Series("Last-checker sync", "#2ca02c"),
+            Series("Runtime work", "#d62728"),
+        ],
+        stacked=True,
+    ),
+    Figure(
+        "energy_overhead",
+        "energy_overhead_parallaft_vs_raft",
+        [Series("Parallaft", "#44aaff"), Series("RAFT", "red")],
+    ),
+    Figure(
+        "checker_utilization",
+        "parallaft_checker_utilization",
+        [
+            Series("Checker-core utilization", "#44aaff"),
+            Series("Checker/main CPU time", "#2ca02c"),
+        ],
+        ylabel="Percentage (%)",
+    ),
+    Figure(
+        "ablation_overhead",
+        "parallaft_ablation",
+        [
+            Series("Parallaft", "#44aaff"),
+            Series("No fork", "#1f77b4"),
+            Series("No memory comparison", "#ff7f0e"),
+            Series("Dynamic slicing", "#2ca02c"),
+            Series("Dynamic CPU frequency", "#d62728"),
+            Series("Dynamic slicing and CPU frequency", "#9467bd"),
+        ],
+    ),
+    Figure(
+        "ablation_waterfall",
+        "parallaft_ablation",
+        [
+            Series("Increase", "#d62728"),
+            Series("Decrease", "#2ca02c"),
+            Series("Total", "#44aaff"),
+        ],
+        waterfall=True,
+    ),
+]
+
+FIGURE_DICT = {f.name: f for f in FIGURES}
+
+# Same size as `set terminal postscript eps size 2.5, 1.4` of the gnuplot scripts,
+# with fonts scaled down to fit in matplotlib's layout
+FIGURE_SIZE = (2.5, 1.4)
+FONT_SIZE = 8
+XTICK_FONT_SIZE = 6
+LEGEND_FONT_SIZE = 6
+RASTER_DPI = 300
+FILL_DENSITY = 0.7
+
+
+def fill_color(color: str) -> Tuple[float, float, float]:
+    # equivalent of gnuplot's `set style fill solid 0.7`, which EPS can render
+    # unlike alpha blending
+    r, g, b = matplotlib.colors.to_rgb(color)
+    return tuple(c * FILL_DENSITY + (1 - FILL_DENSITY) for c in (r, g, b))  # type: ignore
+
+
+def render_figure(
+    figure: Figure, names: List[str], values: np.ndarray
+) -> matplotlib.figure.Figure:
+    fig, ax = plt.subplots(figsize=FIGURE_SIZE)
+    x = np.arange(len(names))
+
+    if figure.stacked:
+        bottom = np.zeros(len(names))
+        for series, column in zip(figure.series, values.T):
+            ax.bar(
+                x,
+                column,
+                0.6,
+                bottom=bottom,
+                label=series.title,
+                color=fill_color(series.color),
+                edgecolor="black",
+                linewidth=0.5,
+            )
+            bottom += np.nan_to_num(column)
+
+        ax.grid(axis="y", linewidth=0.5)
+        handles, labels = ax.get_legend_handles_labels()
+        ax.legend(
+            handles[::-1],
+            labels[::-1],
+            loc="upper left",
+            fontsize=LEGEND_FONT_SIZE,
+            frameon=False,
+        )
+    else:
+        n = len(figure.series)
+        width = 1 / (n + 1)
+        for i, (series, column) in enumerate(zip(figure.series, values.T)):
+            ax.bar(
+                x + (i - (n - 1) / 2) * width,
+                column,
+                width,
+                label=series.title,
+                color=fill_color(series.color),
+                edgecolor="black",
+                linewidth=0.5,
+            )
+
+        ax.set_xticks(x[:-1] + 0.5, minor=True)
+        ax.grid(axis="x", which="minor", linewidth=0.5)
+        ax.grid(axis="y", which="major", linewidth=0.5)
+        ax.legend(loc="upper left", fontsize=LEGEND_FONT_SIZE, frameon=False)
+
+    ax.set_axisbelow(True)
+    ax.set_xlim(-0.5, len(names) - 0.5)
+    # overheads can be negative, e.g. when a variant is faster than the base
+    if np.any(values < 0):
+        ax.axhline(0, color="black", linewidth=0.5)
+    else:
+        ax.set_ylim(bottom=0)
+    ax.set_ylabel(figure.ylabel, fontsize=FONT_SIZE)
+    ax.set_xticks(x)
+    ax.set_xticklabels(
+        names, rotation=45, ha="right", rotation_mode="anchor", fontsize=XTICK_FONT_SIZE
+    )
+    ax.tick_params(axis="x", which="both", length=0)
+    ax.tick_params(axis="y", labelsize=FONT_SIZE)
+    fig.tight_layout(pad=0.2)
+
+    return fig
+
+
+def render_waterfall(
+    figure: Figure, bars: List[Tuple[str, float, bool]], scale: float
+) -> matplotlib.figure.Figure:
+    increase, decrease, total = figure.series
+    fig, ax = plt.subplots(figsize=FIGURE_SIZE)
+    x = np.arange(len(bars))
+
+    level = 0.0
+    for i, (label, value, is_total) in enumerate(bars):
+        value *= scale
+
+        if is_total:
+            bottom, height, series = 0.0, value, total
+            level = value
+        else:
+            bottom, height = level, value
+            series = increase if value >= 0 else decrease
+            level += value
+
+        ax.bar(
+            i,
+            height,
+            0.6,
+            bottom=bottom,
+            color=fill_color(series.color),
+            edgecolor="black",
+            linewidth=0.5,
+        )
+        ax.annotate(
+            f"{value:+.1f}" if not is_total else f"{value:.1f}",
+            (i, max(bottom, bottom + height)),
+            xytext=(0, 1),
+            textcoords="offset points",
+            ha="center",
+            fontsize=LEGEND_FONT_SIZE - 1,
+        )
+
+        # connect each bar to the level the next one starts from
+        if i + 1 < len(bars):
+            ax.plot([i + 0.3, i + 0.7], [level, level], color="black", linewidth=0.4)
+
+    ax.set_axisbelow(True)
+    ax.grid(axis="y", linewidth=0.5)
+    ax.axhline(0, color="black", linewidth=0.5)
+    # leave room for the labels above the bars
+    bottom, top = ax.get_ylim()
+    ax.set_ylim(bottom, top + (top - bottom) * 0.15)
+    ax.set_xlim(-0.5, len(bars) - 0.5)
+    ax.set_ylabel(figure.ylabel, fontsize=FONT_SIZE)
+    ax.set_xticks(x)
+    ax.set_xticklabels(
+        [label for label, _, _ in bars],
+        rotation=45,
+        ha="right",
+        rotation_mode="anchor",
+        fontsize=XTICK_FONT_SIZE,
+    )
+    ax.tick_params(axis="x", which="both", length=0)
+    ax.tick_params(axis="y", labelsize=FONT_SIZE)
+    fig.tight_layout(pad=0.2)
+
+    return fig
+
+
+def plot_figures(
+    figures: List[Figure],
+    experiment_dirs: Dict[ExperimentType, str],
+    output_dir: Path,
+    formats: List[str],
+    scale: float = 100.0,
+    name_suffix: str = "",
+) -> List[Path]:
+    # load and sum the stats once and share them across all figures
+    all_exp_stats = collect_exp_stats(experiment_dirs)
+    outputs = []
+
+    for figure in figures:
+        if figure.waterfall:
+            bars = make_ablation_waterfall(get_ablation_overheads(all_exp_stats))
+
+            if len(bars) == 0:
+                print(f"Skipping {figure.name}: no data", file=sys.stderr)
+                continue
+
+            fig = render_waterfall(figure, bars, scale)
+        else:
+            table = make_table(
+                all_exp_stats,
+                FIELD_GROUPS[figure.field_group],
+                no_bench_number=True,
+                geomean=True,
+            )
+
+            names = [row[0] for row in table]
+            values = np.array([row[1:] for row in table], dtype=float) * scale
+
+            if np.all(np.isnan(values)):
+                print(f"Skipping {figure.name}: no data", file=sys.stderr)
+                continue
+
+            fig = render_figure(figure, names, values)
+
+        for fmt in formats:
+            path = output_dir / f"{figure.name}{name_suffix}.{fmt}"
+            fig.savefig(path, format=fmt, dpi=RASTER_DPI)
+            outputs.append(path)
+
+        plt.close(fig)
+
+    return outputs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("figures", nargs="*", help=f"one of {list(FIGURE_DICT)}")
+    parser.add_argument("--output-dir", type=Path, default=Path("."))
+    parser.add_argument("--format", nargs="+", default=["eps", "png"])
+    parser.add_argument("--scale", default=100.0, type=float)
+    parser.add_argument("--name-suffix", default="")
+    parser.add_argument(
+        "--parallaft-variant",
+        nargs=2,
+        action="append",
+        default=[],
+        metavar=("NAME_SUFFIX", "DIR"),
+        help="also plot the figures with --parallaft replaced by DIR, appending NAME_SUFFIX to their names",
+    )
+
+    for ty in EXPERIMENT_TYPE_LIST:
+        parser.add_argument(f"--{ty.value}")
+
+    args = parser.parse_args()
+
+    experiment_dirs = {}
+    for ty in EXPERIMENT_TYPE_LIST:
+        dir_name = getattr(args, ty.value)
+        if dir_name is not None:
+            experiment_dirs[ty] = dir_name
+
+    if len(experiment_dirs) == 0 and len(args.parallaft_variant) == 0:
+        print("No experiment directories are specified", file=sys.stderr)
+        sys.exit(1)
+
+    for f in args.figures:
+        if f not in FIGURE_DICT:
+            parser.error(f"Unknown figure: {f}")
+
+    figures = [FIGURE_DICT[f] for f in args.figures] if args.figures else FIGURES
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+
+    # each variant is plotted in the same process, skipping the interpreter and
+    # matplotlib start-up
+    runs = [] if args.parallaft_variant and not args.parallaft else [("", None)]
+    runs += args.parallaft_variant
+
+    for suffix, parallaft_dir in runs:
+        dirs = dict(experiment_dirs)
+        if parallaft_dir is not None:
+            dirs[ExperimentType.PARALLAFT] = parallaft_dir
+
+        for path in plot_figures(
+            figures,
+            dirs,
+            args.output_dir,
+            args.format,
+            args.scale,
+            args.name_suffix + suffix,
+        ):
+            print(f"Written {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from collections import OrderedDict
+from pathlib import Path
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from collect_stats import (
+    BENCHMARKS,
+    f_all_wall_time,
+    f_hwmon_all_energy,
+    f_main_wall_time,
+    load_benchmark_stats,
+)
+
+META_FILENAME = "meta.json"
+
+MODE_BASE = "base"
+MODE_BASE_WITH_PERF_COUNTERS = "parallaft_perfcounters"
+
+OPT_MODE = "mode"
+OPT_CORE_ALLOC = "parallaft_core_alloc"
+OPT_CHECKPOINT_PERIOD = "parallaft_checkpoint_period"
+
+# Parallaft options don't change how the baselines run, so they are ignored
+# when matching points to baselines, as is the core plan, which base drops
+PARALLAFT_OPTION_PREFIX = "parallaft_"
+OPT_CORE_PLAN = "core_plan"
+
+
+class SweepPoint(NamedTuple):
+    config: Dict[str, Any]
+    parallaft_ver: Optional[str]
+    run_dirs: List[Path]
+
+    @property
+    def label(self) -> str:
+        parts = [self.config[OPT_MODE]]
+        if OPT_CORE_ALLOC in self.config:
+            parts.append(self.config[OPT_CORE_ALLOC])
+        if OPT_CHECKPOINT_PERIOD in self.config:
+            parts.append(str(self.config[OPT_CHECKPOINT_PERIOD]))
+        if self.parallaft_ver is not None:
+            parts.append(self.parallaft_ver)
+        return "/".join(parts)
+
+    @property
+    def base_key(self) -> str:
+        return json.dumps(
+            {
+                k: v
+                for k, v in self.config.items()
+                if k not in (OPT_MODE, OPT_CORE_PLAN)
+                and not k.startswith(PARALLAFT_OPTION_PREFIX)
+            },
+            sort_keys=True,
+        )
+
+    @property
+    def series(self) -> str:
+        return f"{self.config[OPT_MODE]}/{self.config.get(OPT_CORE_ALLOC, '-')}"
+
+
+def find_sweep_points(run_dir: Path) -> List[SweepPoint]:
+    points: Dict[str, SweepPoint] = OrderedDict()
+
+    for meta_path in sorted(run_dir.glob(f"*/{META_FILENAME}")):
+        meta = json.loads(meta_path.read_text())
+        config = meta["config"]
+        parallaft_ver = meta["env"].get("parallaft_ver")
+
+        # repeats of the same experiment share the same metadata
+        key = json.dumps([config, parallaft_ver], sort_keys=True)
+        if key not in points:
+            points[key] = SweepPoint(config, parallaft_ver, [])
+        points[key].run_dirs.append(meta_path.parent)
+
+    return list(points.values())
+
+
+def load_field_matrix(points: List[SweepPoint], field_names: List[str]) -> np.ndarray:
+    # shape: (points, benchmarks), averaged over repeats of each point
+    out = np.full((len(points), len(BENCHMARKS)), np.nan)
+
+    for i, point in enumerate(points):
+        for j, benchmark in enumerate(BENCHMARKS):
+            samples = []
+            for run_dir in point.run_dirs:
+                stats = load_benchmark_stats(str(run_dir), benchmark)
+                for name in field_names:
+                    if name in stats:
+                        samples.append(stats[name])
+                        break
+
+            if samples:
+                out[i, j] = np.mean(samples)
+
+    return out
+
+
+def common_geomean(overheads: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # only benchmarks with results for every point are included, so that all
+    # geomeans are over the same set; returns the geomeans and that set's mask
+    common = ~np.any(np.isnan(overheads), axis=0)
+    if not np.any(common):
+        return np.full(overheads.shape[0], np.nan), common
+
+    return np.exp(np.mean(np.log1p(overheads[:, common]), axis=-1)) - 1.0, common
+
+
+def load_base_matrix(
+    points: List[SweepPoint],
+    base_points: List[SweepPoint],
+    field_names: List[str],
+    base_mode: str,
+) -> np.ndarray:
+    # the baseline of each point, pooling all repeats of the base runs with the
+    # same config
+    out = np.full((len(points), len(BENCHMARKS)), np.nan)
+    cache: Dict[str, np.ndarray] = {}
+
+    for i, point in enumerate(points):
+        key = point.base_key
+        if key not in cache:
+            run_dirs = sum((p.run_dirs for p in base_points if p.base_key == key), [])
+            if run_dirs:
+                cache[key] = load_field_matrix(
+                    [SweepPoint({}, None, run_dirs)], field_names
+                )[0]
+            else:
+                print(
+                    f"Warning: no {base_mode} experiment matches the config of {point.label}",
+                    file=sys.stderr,
+                )
+                cache[key] = np.full(len(BENCHMARKS), np.nan)
+        out[i] = cache[key]
+
+    return out
+
+
+def pareto_front(costs: np.ndarray) -> np.ndarray:
+    # costs: (points, objectives), lower is better
+    n = costs.shape[0]
+    valid = ~np.any(np.isnan(costs), axis=1)
+    on_front = valid.copy()
+
+    for i in range(n):
+        if not valid[i]:
+            continue
+        dominated_by = (
+            valid & np.all(costs <= costs[i], axis=1) & np.any(costs < costs[i], axis=1)
+        )
+        if np.any(dominated_by):
+            on_front[i] = False
+
+    return on_front
+
+
+class SweepResult(NamedTuple):
+    points: List[SweepPoint]
+    perf_overhead: np.ndarray
+    energy_overhead: np.ndarray
+    perf_overhead_geomean: np.ndarray
+    energy_overhead_geomean: np.ndarray
+    on_pareto_front: np.ndarray
+    perf_benchmarks: np.ndarray
+    energy_benchmarks: np.ndarray
+
+
+def analyze_sweep(run_dir: Path) -> SweepResult:
+    all_points = find_sweep_points(run_dir)
+
+    base_points = [p for p in all_points if p.config[OPT_MODE] == MODE_BASE]
+    base_pc_points = [
+        p for p in all_points if p.config[OPT_MODE] == MODE_BASE_WITH_PERF_COUNTERS
+    ]
+    points = [
+        p
+        for p in all_points
+        if p.config[OPT_MODE] not in (MODE_BASE, MODE_BASE_WITH_PERF_COUNTERS)
+    ]
+    points.sort(key=lambda p: (p.series, p.config.get(OPT_CHECKPOINT_PERIOD, 0)))
+
+    if not base_points:
+        raise RuntimeError(f"No base experiment found under {run_dir}")
+
+    base_wall = load_base_matrix(
+        points, base_points, [f_main_wall_time.name], MODE_BASE
+    )
+    wall = load_field_matrix(points, [f_all_wall_time.name, f_main_wall_time.name])
+    perf_overhead = (wall - base_wall) / base_wall
+
+    energy_overhead = np.full_like(perf_overhead, np.nan)
+    if base_pc_points:
+        base_energy = load_base_matrix(
+            points,
+            base_pc_points,
+            [f_hwmon_all_energy.name],
+            MODE_BASE_WITH_PERF_COUNTERS,
+        )
+        energy = load_field_matrix(points, [f_hwmon_all_energy.name])
+        energy_overhead = (energy - base_energy) / base_energy
+
+    perf_geomean, perf_benchmarks = common_geomean(perf_overhead)
+    energy_geomean, energy_benchmarks = common_geomean(energy_overhead)
+
+    for name, overhead, common in (
+        ("performance", perf_overhead, perf_benchmarks),
+        ("energy", energy_overhead, energy_benchmarks),
+    ):
+        missing = [
+            b.name
+            for b, has_any, in_common in zip(
+                BENCHMARKS, np.any(~np.isnan(overhead), axis=0), common
+            )
+            if has_any and not in_common
+        ]
+        if missing:
+            print(
+                f"Warning: {name} geomeans leave out {', '.join(missing)}, as not every config has results for them",
+                file=sys.stderr,
+            )
+
+    if np.all(np.isnan(energy_geomean)):
+        costs = perf_geomean[:, None]
+    else:
+        costs = np.stack([perf_geomean, energy_geomean], axis=1)
+
+    return SweepResult(
+        points,
+        perf_overhead,
+        energy_overhead,
+        perf_geomean,
+        energy_geomean,
+        pareto_front(costs),
+        perf_benchmarks,
+        energy_benchmarks,
+    )
+
+
+def format_table(result: SweepResult, sep: str = ",", scale: float = 1.0) -> str:
+    out = sep.join(
+        [
+            "config",
+            "nr_runs",
+            "perf_overhead_geomean",
+            "energy_overhead_geomean",
+            "pareto",
+        ]
+    )
+    out += "\n"
+
+    for i, point in enumerate(result.points):
+        out += sep.join(
+            [
+                point.label,
+                str(len(point.run_dirs)),
+                "{:.4f}".format(result.perf_overhead_geomean[i] * scale),
+                "{:.4f}".format(result.energy_overhead_geomean[i] * scale),
+                "1" if result.on_pareto_front[i] else "0",
+            ]
+        )
+        out += "\n"
+
+    return out
+
+
+def plot_pareto(result: SweepResult, path: Path, scale: float):
+    import matplotlib.pyplot as plt
+    from plot_stats import FIGURE_SIZE, FONT_SIZE, LEGEND_FONT_SIZE, RASTER_DPI
+
+    has_energy = not np.all(np.isnan(result.energy_overhead_geomean))
+    x = result.perf_overhead_geomean * scale
+    y = result.energy_overhead_geomean * scale if has_energy else np.zeros_like(x)
+
+    fig, ax = plt.subplots(figsize=(FIGURE_SIZE[0] * 1.5, FIGURE_SIZE[1] * 2))
+
+    for series in OrderedDict.fromkeys(p.series for p in result.points):
+        idx = [i for i, p in enumerate(result.points) if p.series == series]
+        ax.scatter(x[idx], y[idx], s=10, label=series)
+
+    front = np.flatnonzero(result.on_pareto_front)
+    front = front[np.argsort(x[front])]
+    ax.step(x[front], y[front], where="post", color="black", linewidth=0.8)
+
+    for i in front:
+        ax.annotate(
+            result.points[i].label,
+            (x[i], y[i]),
+            fontsize=LEGEND_FONT_SIZE - 1,
+            xytext=(2, 2),
+            textcoords="offset points",
+        )
+
+    ax.set_xlabel("Performance overhead (%)", fontsize=FONT_SIZE)
+    ax.set_ylabel(
+        "Energy overhead (%)" if has_energy else "(no energy data)", fontsize=FONT_SIZE
+    )
+    ax.grid(linewidth=0.5)
+    ax.legend(fontsize=LEGEND_FONT_SIZE, frameon=False)
+    fig.tight_layout(pad=0.2)
+    fig.savefig(path, dpi=RASTER_DPI)
+    plt.close(fig)
+
+
+def plot_checkpoint_period(result: SweepResult, path: Path, scale: float):
+    import matplotlib.pyplot as plt
+    from plot_stats import LEGEND_FONT_SIZE, RASTER_DPI, XTICK_FONT_SIZE
+
+    series_list = list(
+        OrderedDict.fromkeys(
+            p.series for p in result.points if OPT_CHECKPOINT_PERIOD in p.config
+        )
+    )
+
+    names = [b.name for b in BENCHMARKS] + ["geomean"]
+    values = np.concatenate(
+        [result.perf_overhead, result.perf_overhead_geomean[:, None]], axis=1
+    )
+
+    ncols = 6
+    nrows = (len(names) + ncols - 1) // ncols
+    fig, axes = plt.subplots(
+        nrows, ncols, figsize=(ncols * 1.6, nrows * 1.2), sharex=True, squeeze=False
+    )
+
+    for j, (name, ax) in enumerate(zip(names, axes.flat)):
+        for series in series_list:
+            idx = [
+                i
+                for i, p in enumerate(result.points)
+                if p.series == series and OPT_CHECKPOINT_PERIOD in p.config
+            ]
+            idx.sort(key=lambda i: result.points[i].config[OPT_CHECKPOINT_PERIOD])
+            periods = [result.points[i].config[OPT_CHECKPOINT_PERIOD] for i in idx]
+            ax.plot(periods, values[idx, j] * scale, marker=".", label=series)
+
+        ax.set_xscale("log")
+        ax.set_title(name, fontsize=XTICK_FONT_SIZE)
+        ax.tick_params(labelsize=LEGEND_FONT_SIZE - 1)
+        ax.grid(linewidth=0.3)
+
+    for ax in list(axes.flat)[len(names) :]:
+        ax.set_visible(False)
+
+    handles, labels = axes.flat[0].get_legend_handles_labels()
+    fig.legend(handles, labels, loc="lower right", fontsize=LEGEND_FONT_SIZE)
+    fig.supxlabel("Checkpoint period", fontsize=XTICK_FONT_SIZE)
+    fig.supylabel("Performance overhead (%)", fontsize=XTICK_FONT_SIZE)
+    fig.tight_layout(pad=0.3)
+    fig.savefig(path, dpi=RASTER_DPI)
+    plt.close(fig)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("run_dir", type=Path)
+    parser.add_argument("--output")
+    parser.add_argument("--sep", default=",")
+    parser.add_argument("--scale", default=1.0, type=float)
+    parser.add_argument("--plot-dir", type=Path)
+    parser.add_argument("--format", nargs="+", default=["png"])
+    args = parser.parse_args()
+
+    result = analyze_sweep(args.run_dir)
+    if not result.points:
+        print(f"No sweep experiments found under {args.run_dir}", file=sys.stderr)
+        sys.exit(1)
+
+    print(
+        f"Geomeans are over {np.sum(result.perf_benchmarks)} benchmarks for performance and {np.sum(result.energy_benchmarks)} for energy",
+        file=sys.stderr,
+    )
+
+    out_buf = format_table(result, args.sep, args.scale)
+
+    if args.output:
+        with open(args.output, "wt") as f:
+            f.write(out_buf)
+    else:
+        print(out_buf, end="")
+
+    if args.plot_dir is not None:
+        args.plot_dir.mkdir(parents=True, exist_ok=True)
+        for fmt in args.format:
+            plot_pareto(result, args.plot_dir / f"sweep_pareto.{fmt}", 100.0)
+            plot_checkpoint_period(
+                result, args.plot_dir / f"sweep_checkpoint_period.{fmt}", 100.0
+            )
+
+
+if __name__ == "__main__":
+    main()